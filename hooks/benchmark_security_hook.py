@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Benchmark for security_reminder_hook.py
+
+Usage:
+    benchmark_security_hook.py matcher [--iterations N]
+    benchmark_security_hook.py daemon [--iterations N]
+    benchmark_security_hook.py stress [--writers N] [--warnings N] [--shared N]
+    benchmark_security_hook.py cleanup [--files N] [--sessions N] [--iterations N]
+
+Benchmarks:
+    matcher  Prebuilt anchor matcher vs. the original per-substring loop and
+             a single combined regex, on 1 KB, 100 KB and 10 MB payloads
+    daemon   End-to-end hook latency: cold python3 process per edit vs. the
+             client talking to a warm daemon (p50 / p99)
+    stress   N concurrent writer processes recording warnings; verifies the
+             state database loses none (legacy JSON rewrite shown for contrast)
+    cleanup  Indexed session expiry vs. the legacy listdir + getmtime scan, in a
+             state directory holding 100k unrelated files
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add hooks directory to path for sibling import
+sys.path.insert(0, str(Path(__file__).parent))
+import security_reminder_hook as hook
+
+HOOK_DIR = Path(__file__).parent
+
+PAYLOAD_SIZES = [("1 KB", 1024), ("100 KB", 100 * 1024), ("10 MB", 10 * 1024 * 1024)]
+
+# Generated-code filler that contains none of the rule substrings
+FILLER_LINE = "export const value_{i} = computeValue(input_{i}, options.scale);\n"
+
+
+def make_payload(size, trailing_match=""):
+    """Build roughly `size` bytes of clean code, optionally ending with a match."""
+    lines = []
+    total = 0
+    i = 0
+    while total < size:
+        line = FILLER_LINE.format(i=i)
+        lines.append(line)
+        total += len(line)
+        i += 1
+    return "".join(lines)[:size] + trailing_match
+
+
+def legacy_check_patterns(file_path, content):
+    """The original per-substring loop, kept here as the baseline."""
+    normalized_path = file_path.lstrip("/")
+    for rule in hook.get_rules():
+        if hook.path_matches(rule, normalized_path):
+            return rule["ruleName"]
+        if "substrings" in rule and content:
+            for substring in rule["substrings"]:
+                if substring in content:
+                    return rule["ruleName"]
+    return None
+
+
+def build_combined_regex():
+    """One regex alternation over every literal, longest first."""
+    literals = {s for rule in hook.get_rules() for s in rule.get("substrings", ())}
+    ordered = sorted(literals, key=lambda lit: (-len(lit), lit))
+    return re.compile("|".join(map(re.escape, ordered)))
+
+
+def regex_find_all(regex, content):
+    """Find every (overlapping) literal offset with the combined regex."""
+    offsets = []
+    match = regex.search(content)
+    while match:
+        offsets.append(match.start())
+        match = regex.search(content, match.start() + 1)
+    return offsets
+
+
+def best_time_ms(func, iterations):
+    """Return the fastest of `iterations` runs in milliseconds."""
+    best = float("inf")
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def bench_matcher(args):
+    print(f"Matcher benchmark (best of {args.iterations})\n")
+    print(
+        f"{'payload':<10} {'case':<12} {'legacy loop':>14} {'regex':>14} "
+        f"{'matcher':>14} {'vs legacy':>10}"
+    )
+
+    hook.get_content_matcher()  # Exclude the one-time build from the timings
+    regex = build_combined_regex()
+    cases = [("no match", ""), ("late match", "\nos.system(cmd)\n")]
+    for label, size in PAYLOAD_SIZES:
+        for case, trailing in cases:
+            content = make_payload(size, trailing)
+            legacy = best_time_ms(
+                lambda: legacy_check_patterns("src/app.ts", content), args.iterations
+            )
+            combined = best_time_ms(lambda: regex_find_all(regex, content), args.iterations)
+            matcher = best_time_ms(
+                lambda: hook.find_matches("src/app.ts", content), args.iterations
+            )
+            print(
+                f"{label:<10} {case:<12} {legacy:>11.3f} ms {combined:>11.3f} ms "
+                f"{matcher:>11.3f} ms {legacy / matcher:>9.2f}x"
+            )
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def time_command_ms(command, payload, env, iterations):
+    """Run `command` with `payload` on stdin and return per-run latencies."""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        subprocess.run(command, input=payload, env=env, capture_output=True, check=False)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def bench_daemon(args):
+    payload = json.dumps(
+        {
+            "session_id": "benchmark",
+            "tool_name": "Write",
+            "tool_input": {"file_path": "/tmp/app.ts", "content": make_payload(4096)},
+        }
+    ).encode()
+
+    with tempfile.TemporaryDirectory() as home:
+        # Isolate the daemon socket and state files from the real ~/.claude
+        env = dict(os.environ, HOME=home)
+        socket_path = os.path.join(home, ".claude", "security_reminder_hook.sock")
+        daemon = subprocess.Popen(
+            [sys.executable, str(HOOK_DIR / "security_reminder_hook.py"), "serve"], env=env
+        )
+        try:
+            deadline = time.monotonic() + 10
+            while not os.path.exists(socket_path):
+                if time.monotonic() > deadline:
+                    sys.exit("Daemon did not start")
+                time.sleep(0.05)
+
+            cold = time_command_ms(
+                [sys.executable, str(HOOK_DIR / "security_reminder_hook.py")],
+                payload, env, args.iterations,
+            )
+            warm = time_command_ms(
+                [sys.executable, str(HOOK_DIR / "security_reminder_client.py")],
+                payload, env, args.iterations,
+            )
+        finally:
+            daemon.terminate()
+            daemon.wait()
+
+    print(f"Hook latency over {args.iterations} runs (4 KB Write payload)\n")
+    print(f"{'mode':<14} {'p50':>10} {'p99':>10}")
+    for label, samples in [("cold process", cold), ("warm daemon", warm)]:
+        print(
+            f"{label:<14} {percentile(samples, 50):>7.1f} ms "
+            f"{percentile(samples, 99):>7.1f} ms"
+        )
+
+
+def stress_writer(db_path, writer, warnings, shared):
+    """Record this writer's own warnings plus a shared set every writer races on."""
+    hook.STATE_DB = db_path
+    reported = 0
+    keys = [f"/src/w{writer}/file{i}.ts" for i in range(warnings)]
+    keys += [f"/src/shared/file{i}.ts" for i in range(shared)]
+    for file_path in keys:
+        reported += len(hook.mark_warnings_shown("stress", file_path, ["eval_injection"]))
+    return reported
+
+
+def legacy_stress_writer(state_file, writer, warnings, shared):
+    """Same workload against the original load / add / rewrite JSON state."""
+    keys = [f"/src/w{writer}/file{i}.ts-eval_injection" for i in range(warnings)]
+    keys += [f"/src/shared/file{i}.ts-eval_injection" for i in range(shared)]
+    for key in keys:
+        try:
+            with open(state_file) as f:
+                shown = set(json.load(f))
+        except (OSError, json.JSONDecodeError):
+            shown = set()
+        shown.add(key)
+        with open(state_file, "w") as f:
+            json.dump(list(shown), f)
+    return 0
+
+
+def bench_stress(args):
+    expected = args.writers * args.warnings + args.shared
+    jobs = [(w, args.warnings, args.shared) for w in range(args.writers)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "state.db")
+        start = time.perf_counter()
+        with multiprocessing.Pool(args.writers) as pool:
+            reported = sum(pool.starmap(stress_writer, [(db_path, *job) for job in jobs]))
+        elapsed = time.perf_counter() - start
+
+        hook.STATE_DB = db_path
+        conn = hook.connect_state()
+        stored = conn.execute("SELECT COUNT(*) FROM shown_warnings").fetchone()[0]
+        conn.close()
+
+        legacy_file = os.path.join(tmp, "legacy.json")
+        with multiprocessing.Pool(args.writers) as pool:
+            pool.starmap(legacy_stress_writer, [(legacy_file, *job) for job in jobs])
+        try:
+            with open(legacy_file) as f:
+                legacy_stored = len(set(json.load(f)))
+        except (OSError, json.JSONDecodeError):
+            legacy_stored = 0  # The last rewrite was torn
+
+    print(
+        f"{args.writers} writers x {args.warnings} warnings + {args.shared} shared "
+        f"= {expected} distinct warnings\n"
+    )
+    print(f"state database: {stored}/{expected} stored, {reported} reported as new "
+          f"({expected / elapsed:.0f} warnings/s)")
+    print(f"legacy JSON:    {legacy_stored}/{expected} stored")
+
+    if stored != expected or reported != expected:
+        sys.exit("FAIL: warnings were lost or reported more than once")
+    print("\nOK: no warnings lost, each reported exactly once")
+
+
+def legacy_cleanup(state_dir, max_age):
+    """The original cleanup: list the whole directory and stat every state file."""
+    cutoff = time.time() - max_age
+    for filename in os.listdir(state_dir):
+        if filename.startswith("security_warnings_state_") and filename.endswith(".json"):
+            file_path = os.path.join(state_dir, filename)
+            try:
+                if os.path.getmtime(file_path) < cutoff:
+                    os.remove(file_path)
+            except OSError:
+                pass
+
+
+def bench_cleanup(args):
+    expired_count = args.sessions // 10
+    old = time.time() - hook.STATE_MAX_AGE - 3600
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        print(f"Creating {args.files} unrelated files and {args.sessions} session states...")
+        for i in range(args.files):
+            open(os.path.join(state_dir, f"transcript-{i}.jsonl"), "w").close()
+        for i in range(args.sessions):
+            state_file = os.path.join(state_dir, f"security_warnings_state_s{i}.json")
+            with open(state_file, "w") as f:
+                json.dump([f"/src/file{i}.ts-eval_injection"], f)
+            if i < expired_count:
+                os.utime(state_file, (old, old))
+
+        legacy = best_time_ms(lambda: legacy_cleanup(state_dir, hook.STATE_MAX_AGE), args.iterations)
+
+        hook.STATE_DIR = state_dir
+        hook.STATE_DB = os.path.join(state_dir, "security_warnings_state.db")
+        conn = hook.connect_state()
+        start = time.perf_counter()
+        hook.expire_state(conn, force=True)  # One-time migration of the legacy files
+        migration = (time.perf_counter() - start) * 1000
+
+        def expire_with_fresh_sessions():
+            conn.executemany(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?)",
+                [(f"expired{i}", old) for i in range(expired_count)],
+            )
+            start = time.perf_counter()
+            hook.expire_state(conn, force=True)
+            return time.perf_counter() - start
+
+        conn.executemany(
+            "INSERT OR REPLACE INTO sessions VALUES (?, ?)",
+            [(f"live{i}", time.time()) for i in range(args.sessions)],
+        )
+        indexed = min(expire_with_fresh_sessions() for _ in range(args.iterations)) * 1000
+        conn.close()
+
+    print(f"\nCleanup pass (best of {args.iterations}), {expired_count} expired sessions\n")
+    print(f"{'legacy listdir + getmtime':<28} {legacy:>9.3f} ms")
+    print(f"{'indexed expiry':<28} {indexed:>9.3f} ms")
+    print(f"{'one-time legacy migration':<28} {migration:>9.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark security_reminder_hook.py",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    matcher = subparsers.add_parser("matcher", help="Prebuilt matcher vs. substring loop and regex")
+    matcher.add_argument("--iterations", type=int, default=5)
+    matcher.set_defaults(func=bench_matcher)
+
+    daemon = subparsers.add_parser("daemon", help="Cold process vs. warm daemon latency")
+    daemon.add_argument("--iterations", type=int, default=200)
+    daemon.set_defaults(func=bench_daemon)
+
+    stress = subparsers.add_parser("stress", help="Concurrent writers against the state store")
+    stress.add_argument("--writers", type=int, default=16)
+    stress.add_argument("--warnings", type=int, default=200, help="Distinct warnings per writer")
+    stress.add_argument("--shared", type=int, default=50, help="Warnings every writer races on")
+    stress.set_defaults(func=bench_stress)
+
+    cleanup = subparsers.add_parser("cleanup", help="Indexed expiry vs. directory scan")
+    cleanup.add_argument("--files", type=int, default=100_000, help="Unrelated files in the directory")
+    cleanup.add_argument("--sessions", type=int, default=1000)
+    cleanup.add_argument("--iterations", type=int, default=5)
+    cleanup.set_defaults(func=bench_cleanup)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Security Reminder Hook client for Claude Code
+Forwards the hook payload to a resident security_reminder_hook.py daemon and
+relays its exit code and stderr, so each edit skips interpreter warm-up and
+rule setup. Use this script as the PreToolUse hook command in place of
+security_reminder_hook.py.
+
+The daemon is started whenever it cannot be reached (on first use, or after a
+crash left a stale socket behind). Until it is listening the hook runs
+in-process, so no edit is ever left unchecked. Once connected, the daemon's
+answer is final: a timed-out reply is not retried in-process, since the daemon
+may already have recorded the warning as shown.
+"""
+
+import os
+import socket
+import sys
+
+HOOK_DIR = os.path.dirname(os.path.abspath(__file__))
+HOOK_SCRIPT = os.path.join(HOOK_DIR, "security_reminder_hook.py")
+SOCKET_PATH = os.path.expanduser("~/.claude/security_reminder_hook.sock")
+CLIENT_TIMEOUT = 10  # Seconds to wait on the daemon before running in-process
+
+
+def connect():
+    """Open a connection to the daemon; raises OSError if it is not listening."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CLIENT_TIMEOUT)
+        sock.connect(SOCKET_PATH)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def forward(sock, raw_input):
+    """Send the payload over a connected socket and return (exit_code, stderr_text)."""
+    with sock:
+        sock.sendall(raw_input)
+        sock.shutdown(socket.SHUT_WR)
+        chunks = []
+        while chunk := sock.recv(65536):
+            chunks.append(chunk)
+
+    status, _, stderr = b"".join(chunks).decode().partition("\n")
+    return int(status), stderr
+
+
+def start_daemon():
+    """Launch the daemon detached from this process."""
+    import subprocess
+
+    subprocess.Popen(
+        [sys.executable, HOOK_SCRIPT, "serve"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def run_in_process(raw_input):
+    """Fallback: run the hook logic directly in this process."""
+    sys.path.insert(0, HOOK_DIR)
+    from security_reminder_hook import run_hook
+
+    return run_hook(raw_input)
+
+
+def main():
+    if os.environ.get("ENABLE_SECURITY_REMINDER", "1") == "0":
+        sys.exit(0)
+
+    raw_input = sys.stdin.buffer.read()
+    try:
+        sock = connect()
+    except OSError:
+        # No daemon, or a stale socket from one that died; serve() takes the
+        # lock and replaces the socket, so starting another is always safe
+        try:
+            start_daemon()
+        except OSError:
+            pass  # Keep working without a daemon
+        exit_code, stderr = run_in_process(raw_input)
+    else:
+        try:
+            exit_code, stderr = forward(sock, raw_input)
+        except ValueError:
+            # Closed without a reply: the daemon failed the request itself
+            exit_code, stderr = run_in_process(raw_input)
+        except OSError:
+            # Timed out or dropped mid-request. The daemon may have recorded
+            # the warning as shown already, so a rerun here would suppress it
+            exit_code, stderr = 0, ""
+
+    if stderr:
+        print(stderr, file=sys.stderr)
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,12 @@
 """
 Security Reminder Hook for Claude Code
 This hook checks for security patterns in file edits and warns about potential vulnerabilities.
+Rules are loaded from the JSON rule packs in security_rules/ (see RULE_PACK_DIRS).
 """
 
+import hashlib
 import json
 import os
-import random
 import sys
 from datetime import datetime
 
@@ -25,178 +26,715 @@ def debug_log(message):
         pass
 
 
-# State file to track warnings shown (session-scoped using session ID)
-
-# Security patterns configuration
-SECURITY_PATTERNS = [
-    {
-        "ruleName": "github_actions_workflow",
-        "path_check": lambda path: ".github/workflows/" in path
-        and (path.endswith(".yml") or path.endswith(".yaml")),
-        "reminder": """You are editing a GitHub Actions workflow file. Be aware of these security risks:
-
-1. **Command Injection**: Never use untrusted input (like issue titles, PR descriptions, commit messages) directly in run: commands without proper escaping
-2. **Use environment variables**: Instead of ${{ github.event.issue.title }}, use env: with proper quoting
-3. **Review the guide**: https://github.blog/security/vulnerability-research/how-to-catch-github-actions-workflow-injections-before-attackers-do/
-
-Example of UNSAFE pattern to avoid:
-run: echo "${{ github.event.issue.title }}"
-
-Example of SAFE pattern:
-env:
-  TITLE: ${{ github.event.issue.title }}
-run: echo "$TITLE"
-
-Other risky inputs to be careful with:
-- github.event.issue.body
-- github.event.pull_request.title
-- github.event.pull_request.body
-- github.event.comment.body
-- github.event.review.body
-- github.event.review_comment.body
-- github.event.pages.*.page_name
-- github.event.commits.*.message
-- github.event.head_commit.message
-- github.event.head_commit.author.email
-- github.event.head_commit.author.name
-- github.event.commits.*.author.email
-- github.event.commits.*.author.name
-- github.event.pull_request.head.ref
-- github.event.pull_request.head.label
-- github.event.pull_request.head.repo.default_branch
-- github.head_ref""",
-    },
-    {
-        "ruleName": "child_process_exec",
-        "substrings": ["child_process.exec", "exec(", "execSync("],
-        "reminder": """⚠️ Security Warning: Using child_process.exec() can lead to command injection vulnerabilities.
-
-This codebase provides a safer alternative: src/utils/execFileNoThrow.ts
-
-Instead of:
-  exec(`command ${userInput}`)
-
-Use:
-  import { execFileNoThrow } from '../utils/execFileNoThrow.js'
-  await execFileNoThrow('command', [userInput])
-
-The execFileNoThrow utility:
-- Uses execFile instead of exec (prevents shell injection)
-- Handles Windows compatibility automatically
-- Provides proper error handling
-- Returns structured output with stdout, stderr, and status
-
-Only use exec() if you absolutely need shell features and the input is guaranteed to be safe.""",
-    },
-    {
-        "ruleName": "new_function_injection",
-        "substrings": ["new Function"],
-        "reminder": "⚠️ Security Warning: Using new Function() with dynamic strings can lead to code injection vulnerabilities. Consider alternative approaches that don't evaluate arbitrary code. Only use new Function() if you truly need to evaluate arbitrary dynamic code.",
-    },
-    {
-        "ruleName": "eval_injection",
-        "substrings": ["eval("],
-        "reminder": "⚠️ Security Warning: eval() executes arbitrary code and is a major security risk. Consider using JSON.parse() for data parsing or alternative design patterns that don't require code evaluation. Only use eval() if you truly need to evaluate arbitrary code.",
-    },
-    {
-        "ruleName": "react_dangerously_set_html",
-        "substrings": ["dangerouslySetInnerHTML"],
-        "reminder": "⚠️ Security Warning: dangerouslySetInnerHTML can lead to XSS vulnerabilities if used with untrusted content. Ensure all content is properly sanitized using an HTML sanitizer library like DOMPurify, or use safe alternatives.",
-    },
-    {
-        "ruleName": "document_write_xss",
-        "substrings": ["document.write"],
-        "reminder": "⚠️ Security Warning: document.write() can be exploited for XSS attacks and has performance issues. Use DOM manipulation methods like createElement() and appendChild() instead.",
-    },
-    {
-        "ruleName": "innerHTML_xss",
-        "substrings": [".innerHTML =", ".innerHTML="],
-        "reminder": "⚠️ Security Warning: Setting innerHTML with untrusted content can lead to XSS vulnerabilities. Use textContent for plain text or safe DOM methods for HTML content. If you need HTML support, consider using an HTML sanitizer library such as DOMPurify.",
-    },
-    {
-        "ruleName": "pickle_deserialization",
-        "substrings": ["pickle"],
-        "reminder": "⚠️ Security Warning: Using pickle with untrusted content can lead to arbitrary code execution. Consider using JSON or other safe serialization formats instead. Only use pickle if it is explicitly needed or requested by the user.",
-    },
-    {
-        "ruleName": "os_system_injection",
-        "substrings": ["os.system", "from os import system"],
-        "reminder": "⚠️ Security Warning: This code appears to use os.system. This should only be used with static arguments and never with arguments that could be user-controlled.",
-    },
-]
+# Database tracking warnings shown, keyed by (session ID, file path, rule)
+STATE_DIR = os.path.expanduser("~/.claude")
+STATE_DB = os.path.join(STATE_DIR, "security_warnings_state.db")
+STATE_BUSY_TIMEOUT = 10  # Seconds a writer waits for the database lock
+STATE_WAL_SIZE_LIMIT = 1024 * 1024  # Bytes the WAL is truncated to after checkpoints
+STATE_MAX_AGE = 30 * 24 * 60 * 60  # Sessions untouched this long (seconds) expire
+STATE_CLEANUP_INTERVAL = 24 * 60 * 60  # Seconds between expiry passes
+
+# Verdict cache: content hash -> matched rules, kept in the state database
+VERDICT_CACHE_MIN_CHARS = 256 * 1024  # Smaller scans are cheaper than a lookup
+VERDICT_CACHE_MAX_ENTRIES = 10_000
+VERDICT_CACHE_MAX_AGE = 7 * 24 * 60 * 60  # Seconds since last use before eviction
+
+# Resident daemon settings (see security_reminder_client.py)
+SOCKET_PATH = os.path.expanduser("~/.claude/security_reminder_hook.sock")
+DAEMON_LOCK_FILE = os.path.expanduser("~/.claude/security_reminder_hook.lock")
+DAEMON_IDLE_TIMEOUT = 30 * 60  # Seconds without requests before the daemon exits
+DAEMON_WATCH_INTERVAL = 5  # Seconds between idle / script-change checks
+
+# Declarative rule packs: every *.json file in these directories, in order.
+# A pack is {"rules": [...]}. Each rule has a "ruleName", "substrings" and/or
+# path conditions ("path_contains" and "path_suffixes", each matching on any
+# entry; both must hold when both are given), and either an inline "reminder"
+# or a "reminder_file" relative to the pack, read only when the rule fires.
+# A later rule with the same name replaces an earlier one; invalid rules are
+# skipped with a warning on stderr.
+RULE_PACK_DIRS = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "security_rules"),
+    os.path.join(STATE_DIR, "security_rules"),
+] + [d for d in os.environ.get("SECURITY_REMINDER_RULES_PATH", "").split(os.pathsep) if d]
+
+# Merged rules plus the prebuilt matcher, invalidated by pack mtime and size
+RULES_CACHE_FILE = os.path.join(STATE_DIR, "security_rules_cache.json")
+RULES_CACHE_FORMAT = 1
 
 
 def get_state_file(session_id):
-    """Get session-specific state file path."""
-    return os.path.expanduser(f"~/.claude/security_warnings_state_{session_id}.json")
+    """Get the legacy session-specific JSON state file path."""
+    return os.path.join(STATE_DIR, f"security_warnings_state_{session_id}.json")
 
 
-def cleanup_old_state_files():
-    """Remove state files older than 30 days."""
+def cleanup_old_state_files(force=False):
+    """Expire sessions untouched for 30 days, at most once per cleanup interval."""
     try:
-        state_dir = os.path.expanduser("~/.claude")
-        if not os.path.exists(state_dir):
-            return
+        conn = connect_state()
+        try:
+            expire_state(conn, force)
+        finally:
+            conn.close()
+    except Exception:
+        pass  # Silently ignore cleanup errors
+
+
+def connect_state():
+    """Open the shared warning state database (SQLite in WAL mode).
+
+    WAL lets many hook processes and daemon threads read while one writes, and
+    the busy timeout makes concurrent writers wait their turn instead of failing.
+    """
+    import sqlite3
+
+    os.makedirs(os.path.dirname(STATE_DB), exist_ok=True)
+    conn = sqlite3.connect(STATE_DB, timeout=STATE_BUSY_TIMEOUT, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA journal_size_limit={STATE_WAL_SIZE_LIMIT}")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS shown_warnings ("
+        " session_id TEXT NOT NULL,"
+        " file_path TEXT NOT NULL,"
+        " rule_name TEXT NOT NULL,"
+        " shown_at REAL NOT NULL,"
+        " PRIMARY KEY (session_id, file_path, rule_name)"
+        ") WITHOUT ROWID"
+    )
+    # Expiry index: cleanup reads only the sessions past their cutoff
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS sessions ("
+        " session_id TEXT PRIMARY KEY,"
+        " last_touched REAL NOT NULL"
+        ") WITHOUT ROWID"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS sessions_last_touched ON sessions (last_touched)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS state_meta (key TEXT PRIMARY KEY, value) WITHOUT ROWID"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS verdict_cache ("
+        " key BLOB PRIMARY KEY,"
+        " rules TEXT NOT NULL,"
+        " last_used REAL NOT NULL"
+        ") WITHOUT ROWID"
+    )
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS verdict_cache_last_used ON verdict_cache (last_used)"
+    )
+    return conn
+
+
+def compact_state(conn):
+    """Fold the WAL back into the database and truncate it."""
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def touch_session(conn, session_id, touched_at):
+    """Move a session's last-touched time forward in the expiry index."""
+    conn.execute(
+        "INSERT INTO sessions VALUES (?, ?) ON CONFLICT (session_id) "
+        "DO UPDATE SET last_touched = MAX(last_touched, excluded.last_touched)",
+        (session_id, touched_at),
+    )
+
+
+def expire_state(conn, force=False):
+    """Drop expired sessions if the cleanup interval has elapsed.
+
+    Returns True if a cleanup pass ran. Only index entries past the cutoff are
+    visited; the state directory itself is listed once ever, to migrate any
+    legacy JSON state files.
+    """
+    now = datetime.now().timestamp()
+
+    def due(meta):
+        return force or now - meta.get("last_cleanup", 0) >= STATE_CLEANUP_INTERVAL
+
+    # Cheap unlocked check first; re-checked under the write lock below
+    if not due(dict(conn.execute("SELECT key, value FROM state_meta"))):
+        return False
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        meta = dict(conn.execute("SELECT key, value FROM state_meta"))
+        if not due(meta):
+            conn.execute("COMMIT")
+            return False
+        conn.execute("INSERT OR REPLACE INTO state_meta VALUES ('last_cleanup', ?)", (now,))
+
+        if not meta.get("legacy_swept"):
+            sweep_legacy_state_files(conn)
+            conn.execute("INSERT OR REPLACE INTO state_meta VALUES ('legacy_swept', 1)")
+
+        expired = conn.execute(
+            "SELECT session_id FROM sessions WHERE last_touched < ?", (now - STATE_MAX_AGE,)
+        ).fetchall()
+        conn.executemany("DELETE FROM shown_warnings WHERE session_id = ?", expired)
+        conn.executemany("DELETE FROM sessions WHERE session_id = ?", expired)
+        conn.execute(
+            "DELETE FROM verdict_cache WHERE last_used < ?", (now - VERDICT_CACHE_MAX_AGE,)
+        )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
 
-        current_time = datetime.now().timestamp()
-        thirty_days_ago = current_time - (30 * 24 * 60 * 60)
+    compact_state(conn)
+    return True
 
-        for filename in os.listdir(state_dir):
-            if filename.startswith("security_warnings_state_") and filename.endswith(
-                ".json"
-            ):
-                file_path = os.path.join(state_dir, filename)
+
+def sweep_legacy_state_files(conn):
+    """Import every legacy JSON state file and index sessions missing from it."""
+    prefix, suffix = "security_warnings_state_", ".json"
+    if os.path.isdir(STATE_DIR):
+        for filename in os.listdir(STATE_DIR):
+            if filename.startswith(prefix) and filename.endswith(suffix):
                 try:
-                    file_mtime = os.path.getmtime(file_path)
-                    if file_mtime < thirty_days_ago:
-                        os.remove(file_path)
-                except (OSError, IOError):
-                    pass  # Ignore errors for individual file cleanup
-    except Exception:
-        pass  # Silently ignore cleanup errors
+                    mtime = os.path.getmtime(os.path.join(STATE_DIR, filename))
+                except OSError:
+                    continue
+                import_legacy_state(conn, filename[len(prefix):-len(suffix)], mtime)
+
+    conn.execute(
+        "INSERT OR IGNORE INTO sessions "
+        "SELECT session_id, MAX(shown_at) FROM shown_warnings GROUP BY session_id"
+    )
 
 
-def load_state(session_id):
-    """Load the state of shown warnings from file."""
+def import_legacy_state(conn, session_id, touched_at):
+    """Move a session's legacy JSON state file into the database, once."""
     state_file = get_state_file(session_id)
-    if os.path.exists(state_file):
+    if not os.path.exists(state_file):
+        return
+    try:
+        with open(state_file, "r") as f:
+            warning_keys = json.load(f)
+    except (json.JSONDecodeError, IOError):
+        warning_keys = []
+
+    rows = []
+    for warning_key in warning_keys:
+        # Keys are "<file_path>-<ruleName>" and rule names contain no hyphens
+        file_path, _, rule_name = warning_key.rpartition("-")
+        if file_path:
+            rows.append((session_id, file_path, rule_name, touched_at))
+    conn.executemany("INSERT OR IGNORE INTO shown_warnings VALUES (?, ?, ?, ?)", rows)
+    touch_session(conn, session_id, touched_at)
+    try:
+        os.remove(state_file)
+    except OSError:
+        pass
+
+
+def mark_warnings_shown(session_id, file_path, rule_names):
+    """Record warnings as shown and return the rule names that were new.
+
+    Each insert is an atomic test-and-set, so when several hook processes race
+    on the same warning exactly one of them reports it, and none are lost.
+    Expired sessions are cleaned up here once the cleanup interval has elapsed.
+    """
+    conn = connect_state()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        shown_at = datetime.now().timestamp()
+        import_legacy_state(conn, session_id, shown_at)
+        touch_session(conn, session_id, shown_at)
+        new_rules = []
+        for rule_name in rule_names:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO shown_warnings VALUES (?, ?, ?, ?)",
+                (session_id, file_path, rule_name, shown_at),
+            )
+            if cursor.rowcount:
+                new_rules.append(rule_name)
+        conn.execute("COMMIT")
+
         try:
-            with open(state_file, "r") as f:
-                return set(json.load(f))
-        except (json.JSONDecodeError, IOError):
-            return set()
-    return set()
+            expire_state(conn)
+        except Exception as e:
+            debug_log(f"State cleanup failed: {e}")
+        return new_rules
+    finally:
+        conn.close()
 
 
-def save_state(session_id, shown_warnings):
-    """Save the state of shown warnings to file."""
-    state_file = get_state_file(session_id)
+def bump_counter(conn, name):
+    """Increment a counter kept in state_meta."""
+    conn.execute(
+        "INSERT INTO state_meta VALUES (?, 1) "
+        "ON CONFLICT (key) DO UPDATE SET value = value + 1",
+        (name,),
+    )
+
+
+def lookup_verdict(conn, key):
+    """Return the cached rule names for a content hash, or None on a miss."""
+    row = conn.execute("SELECT rules FROM verdict_cache WHERE key = ?", (key,)).fetchone()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if row is None:
+            bump_counter(conn, "verdict_cache_misses")
+        else:
+            bump_counter(conn, "verdict_cache_hits")
+            conn.execute(
+                "UPDATE verdict_cache SET last_used = ? WHERE key = ?",
+                (datetime.now().timestamp(), key),
+            )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return None if row is None else json.loads(row[0])
+
+
+def store_verdict(conn, key, rule_names):
+    """Cache the rule names for a content hash, evicting least recently used."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO verdict_cache VALUES (?, ?, ?)",
+            (key, json.dumps(sorted(rule_names)), datetime.now().timestamp()),
+        )
+        conn.execute(
+            "DELETE FROM verdict_cache WHERE key IN (SELECT key FROM verdict_cache "
+            "ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (VERDICT_CACHE_MAX_ENTRIES,),
+        )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def verdict_cache_stats():
+    """Return the verdict cache hit/miss counters and size."""
+    conn = connect_state()
+    try:
+        meta = dict(conn.execute("SELECT key, value FROM state_meta"))
+        entries = conn.execute("SELECT COUNT(*) FROM verdict_cache").fetchone()[0]
+    finally:
+        conn.close()
+    hits = meta.get("verdict_cache_hits", 0)
+    misses = meta.get("verdict_cache_misses", 0)
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+        "entries": entries,
+    }
+
+
+# Literals sharing at least this many leading characters share one scan
+MIN_ANCHOR_LENGTH = 4
+
+# Diff-aware scanning of Write payloads against the file on disk
+DIFF_MAX_BYTES = 64 * 1024 * 1024  # Larger existing files are scanned in full
+DIFF_CHUNK = 64 * 1024  # Characters compared per step when trimming common ends
+
+# Repository scan (`security_reminder_hook.py scan <dir>`)
+SCAN_BATCH_SIZE = 256  # Files per worker task
+SCAN_BINARY_SNIFF = 8192  # Leading bytes checked for NUL to detect binaries
+SCAN_MAX_MATCHES = 100  # Match offsets reported per file
+
+
+def rule_pack_signature():
+    """Return [path, mtime_ns, size] for every rule pack file, in load order."""
+    signature = []
+    for directory in RULE_PACK_DIRS:
+        try:
+            names = sorted(name for name in os.listdir(directory) if name.endswith(".json"))
+        except OSError:
+            continue
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            signature.append([path, info.st_mtime_ns, info.st_size])
+    return signature
+
+
+def rule_problem(rule):
+    """Return why a rule pack entry is unusable, or None if it is a valid rule."""
+    if not isinstance(rule, dict):
+        return "not an object"
+    if not isinstance(rule.get("ruleName"), str) or not rule["ruleName"]:
+        return "missing ruleName"
+    for field in ("substrings", "path_contains", "path_suffixes"):
+        value = rule.get(field, [])
+        if not isinstance(value, list) or not all(isinstance(item, str) and item for item in value):
+            return f"{field} must be a list of non-empty strings"
+    for field in ("reminder", "reminder_file"):
+        if field in rule and not isinstance(rule[field], str):
+            return f"{field} must be a string"
+    if "reminder" not in rule and "reminder_file" not in rule:
+        return "missing reminder or reminder_file"
+    return None
+
+
+def warn_rule_pack(message):
+    """Report a rule pack problem on stderr and in the debug log."""
+    print(f"security_reminder_hook: {message}", file=sys.stderr)
+    debug_log(message)
+
+
+def parse_rule_packs(signature):
+    """Read and merge the rule packs listed in a signature.
+
+    Invalid rules are skipped with a warning; the rest of the pack still loads.
+    """
+    rules = {}
+    for path, _, _ in signature:
+        try:
+            with open(path, "r") as f:
+                pack = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            warn_rule_pack(f"Skipping rule pack {path}: {e}")
+            continue
+        entries = pack.get("rules", []) if isinstance(pack, dict) else None
+        if not isinstance(entries, list):
+            warn_rule_pack(f"Skipping rule pack {path}: expected {{\"rules\": [...]}}")
+            continue
+        for position, rule in enumerate(entries):
+            problem = rule_problem(rule)
+            if problem:
+                name = rule.get("ruleName") if isinstance(rule, dict) else None
+                warn_rule_pack(f"Skipping rule {name or f'#{position + 1}'} in {path}: {problem}")
+                continue
+            rule = dict(rule)
+            if "reminder_file" in rule:
+                rule["reminder_file"] = os.path.join(os.path.dirname(path), rule["reminder_file"])
+            rules[rule["ruleName"]] = rule
+    return list(rules.values())
+
+
+def load_rules(signature):
+    """Return (rules, matcher) for a pack signature, via the on-disk cache."""
+    try:
+        with open(RULES_CACHE_FILE, "r") as f:
+            cache = json.load(f)
+        if cache.get("format") == RULES_CACHE_FORMAT and cache.get("signature") == signature:
+            return cache["rules"], cache["matcher"]
+    except (OSError, ValueError):
+        pass
+
+    rules = parse_rule_packs(signature)
+    matcher = build_content_matcher(rules)
+    cache = {"format": RULES_CACHE_FORMAT, "signature": signature, "rules": rules, "matcher": matcher}
     try:
-        os.makedirs(os.path.dirname(state_file), exist_ok=True)
-        with open(state_file, "w") as f:
-            json.dump(list(shown_warnings), f)
-    except IOError as e:
-        debug_log(f"Failed to save state file: {e}")
-        pass  # Fail silently if we can't save state
+        os.makedirs(os.path.dirname(RULES_CACHE_FILE), exist_ok=True)
+        temp_file = f"{RULES_CACHE_FILE}.{os.getpid()}.tmp"
+        with open(temp_file, "w") as f:
+            json.dump(cache, f)
+        os.replace(temp_file, RULES_CACHE_FILE)
+    except OSError as e:
+        debug_log(f"Failed to write rules cache: {e}")
+    return rules, matcher
+
+
+_rules = None
+_content_matcher = None
+_rules_signature = None
+
+
+def refresh_rules():
+    """Load the rules, or reload them if any pack changed since the last load."""
+    global _rules, _content_matcher, _rules_signature
+    signature = rule_pack_signature()
+    if signature != _rules_signature:
+        _rules, _content_matcher = load_rules(signature)
+        _rules_signature = signature
+
+
+def get_rules():
+    """Return the loaded rule list."""
+    if _rules is None:
+        refresh_rules()
+    return _rules
+
 
+def get_reminder(rule):
+    """Return a rule's reminder text, reading it from its file on first use."""
+    if "reminder" not in rule:
+        try:
+            with open(rule["reminder_file"], "r") as f:
+                rule["reminder"] = f.read().rstrip("\n")
+        except (KeyError, OSError) as e:
+            debug_log(f"Missing reminder for {rule['ruleName']}: {e}")
+            rule["reminder"] = f"⚠️ Security Warning: {rule['ruleName']}"
+    return rule["reminder"]
+
+
+def path_matches(rule, normalized_path):
+    """Check a rule's declarative path conditions against a normalized path."""
+    contains = rule.get("path_contains")
+    suffixes = rule.get("path_suffixes")
+    if not contains and not suffixes:
+        return False
+    if contains and not any(part in normalized_path for part in contains):
+        return False
+    return not suffixes or normalized_path.endswith(tuple(suffixes))
+
+
+def build_content_matcher(patterns):
+    """Precompute the scan plan for every rule substring.
+
+    CPython's str.find runs at memchr speed and beats a single regex alternation
+    over the same literals, since the regex engine stops on every character that
+    could start a literal. Literals sharing a prefix are grouped under it as one
+    anchor, so each group costs one scan and every anchor hit is confirmed with
+    startswith for each literal in the group.
+    """
+    literal_rules = {}
+    for pattern in patterns:
+        for substring in pattern.get("substrings", ()):
+            rules = literal_rules.setdefault(substring, [])
+            if pattern["ruleName"] not in rules:
+                rules.append(pattern["ruleName"])
+
+    groups = []
+    for literal in sorted(literal_rules):
+        member = (literal, literal_rules[literal])
+        if groups:
+            anchor, members = groups[-1]
+            common = os.path.commonprefix([anchor, literal])
+            if len(common) >= MIN_ANCHOR_LENGTH:
+                groups[-1] = (common, members + [member])
+                continue
+        groups.append((literal, [member]))
+
+    # Line-based diff scanning is only sound if no literal spans lines
+    multiline = any(literal.splitlines() != [literal] for literal in literal_rules)
+
+    # Identifies the rule set in verdict cache keys
+    version = hashlib.blake2b(repr(groups).encode(), digest_size=16).hexdigest()
+    return {"groups": groups, "multiline": multiline, "version": version}
+
+
+def get_content_matcher():
+    """Return the content matcher for the loaded rules."""
+    get_rules()
+    return _content_matcher
+
+
+def find_content_matches(content, start=0, end=None, matcher=None):
+    """Return (rule_name, offset) for every substring match in content[start:end].
 
-def check_patterns(file_path, content):
-    """Check if file path or content matches any security patterns."""
+    All occurrences are reported, including overlapping ones, ordered by offset.
+    """
+    matcher = matcher or get_content_matcher()
+    if not content:
+        return []
+
+    matches = []
+    find = content.find
+    startswith = content.startswith
+    for anchor, members in matcher["groups"]:
+        offset = find(anchor, start, end)
+        while offset != -1:
+            for literal, rules in members:
+                if startswith(literal, offset, end):
+                    matches.extend((rule_name, offset) for rule_name in rules)
+            offset = find(anchor, offset + 1, end)
+
+    matches.sort(key=lambda match: match[1])
+    return matches
+
+
+def encode_matcher(matcher):
+    """Return a copy of a content matcher with UTF-8 byte literals."""
+    groups = [
+        (anchor.encode(), [(literal.encode(), rules) for literal, rules in members])
+        for anchor, members in matcher["groups"]
+    ]
+    return dict(matcher, groups=groups)
+
+
+def find_buffer_matches(buffer, matcher):
+    """find_content_matches for bytes-like buffers such as mmap; byte offsets."""
+    matches = []
+    for anchor, members in matcher["groups"]:
+        offset = buffer.find(anchor)
+        while offset != -1:
+            for literal, rules in members:
+                if buffer[offset : offset + len(literal)] == literal:
+                    matches.extend((rule_name, offset) for rule_name in rules)
+            offset = buffer.find(anchor, offset + 1)
+
+    matches.sort(key=lambda match: match[1])
+    return matches
+
+
+def find_matches(file_path, content, regions=None):
+    """Return (rule_name, offset) for every path and content match.
+
+    Path-based rules are reported with an offset of None. If `regions` is a
+    list of (start, end) spans, only those parts of the content are scanned.
+    """
     # Normalize path by removing leading slashes
     normalized_path = file_path.lstrip("/")
 
-    for pattern in SECURITY_PATTERNS:
-        # Check path-based patterns
-        if "path_check" in pattern and pattern["path_check"](normalized_path):
-            return pattern["ruleName"], pattern["reminder"]
+    matches = [
+        (rule["ruleName"], None) for rule in get_rules() if path_matches(rule, normalized_path)
+    ]
+    if content:
+        if regions is None:
+            matches.extend(find_content_matches(content))
+        else:
+            for start, end in regions:
+                matches.extend(find_content_matches(content, start, end))
+    return matches
+
+
+def content_rules(content, regions=None):
+    """Return the names of content rules matching the scanned content.
 
-        # Check content-based patterns
-        if "substrings" in pattern and content:
-            for substring in pattern["substrings"]:
-                if substring in content:
-                    return pattern["ruleName"], pattern["reminder"]
+    Large scans go through the verdict cache, keyed by the rule set version and
+    the scanned text, so identical content is only ever scanned once.
+    """
+    spans = [(0, len(content))] if regions is None else regions
+    if sum(end - start for start, end in spans) < VERDICT_CACHE_MIN_CHARS:
+        return {rule_name for rule_name, _ in find_matches("", content, regions)}
 
-    return None, None
+    digest = hashlib.blake2b(get_content_matcher()["version"].encode(), digest_size=16)
+    for start, end in spans:
+        data = content[start:end].encode("utf-8", "surrogatepass")
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    key = digest.digest()
+
+    try:
+        conn = connect_state()
+        try:
+            cached = lookup_verdict(conn, key)
+            if cached is not None:
+                return set(cached)
+            rule_names = {rule_name for rule_name, _ in find_matches("", content, regions)}
+            store_verdict(conn, key, rule_names)
+            return rule_names
+        finally:
+            conn.close()
+    except Exception as e:
+        debug_log(f"Verdict cache unavailable: {e}")
+        return {rule_name for rule_name, _ in find_matches("", content, regions)}
+
+
+def check_patterns(file_path, content, regions=None):
+    """Return every rule that matches the path or content, in rule order."""
+    matched = {rule_name for rule_name, _ in find_matches(file_path, "")}
+    if content:
+        matched |= content_rules(content, regions)
+    return [rule for rule in get_rules() if rule["ruleName"] in matched]
+
+
+def common_prefix_length(a, b):
+    """Length of the common prefix of two strings, compared chunk by chunk."""
+    limit = min(len(a), len(b))
+    i = 0
+    while i < limit and a[i : i + DIFF_CHUNK] == b[i : i + DIFF_CHUNK]:
+        i += DIFF_CHUNK
+    i = min(i, limit)
+    while i < limit and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def common_suffix_length(a, b, limit):
+    """Length of the common suffix of two strings, at most `limit`."""
+    len_a, len_b = len(a), len(b)
+    i = 0
+    while i < limit and a[len_a - i - DIFF_CHUNK : len_a - i] == b[len_b - i - DIFF_CHUNK : len_b - i]:
+        i += DIFF_CHUNK
+    i = min(i, limit)
+    while i < limit and a[len_a - i - 1] == b[len_b - i - 1]:
+        i += 1
+    return i
+
+
+def diff_regions(old_text, new_text, base=0):
+    """Return (start, end) spans of new_text holding lines absent from old_text.
+
+    The common prefix and suffix are trimmed first (whole lines only, so a
+    literal formed across the edit boundary is still caught); within what is
+    left, lines that already existed in the old text are skipped. Offsets are
+    shifted by `base`.
+    """
+    prefix = common_prefix_length(old_text, new_text)
+    suffix = common_suffix_length(
+        old_text, new_text, min(len(old_text), len(new_text)) - prefix
+    )
+
+    start = new_text.rfind("\n", 0, prefix) + 1
+    end = len(new_text) - suffix
+    if end > start and new_text[end - 1] != "\n":
+        line_end = new_text.find("\n", end)
+        end = len(new_text) if line_end == -1 else line_end
+    if end <= start:
+        return []
+
+    # The matching old span, widened to whole lines so no partial line counts
+    old_end = len(old_text) - (len(new_text) - end)
+    if old_end > start and old_text[old_end - 1] != "\n":
+        line_end = old_text.find("\n", old_end)
+        old_end = len(old_text) if line_end == -1 else line_end
+    old_lines = set(old_text[start:old_end].splitlines())
+    regions = []
+    offset = start
+    for line in new_text[start:end].splitlines(keepends=True):
+        line_end = offset + len(line)
+        if line.rstrip("\r\n") not in old_lines:
+            if regions and regions[-1][1] == base + offset:
+                regions[-1] = (regions[-1][0], base + line_end)
+            else:
+                regions.append((base + offset, base + line_end))
+        offset = line_end
+    return regions
+
+
+def read_existing_text(file_path):
+    """Return the current text of file_path, or None if it can't be diffed."""
+    try:
+        if not os.path.isfile(file_path) or os.path.getsize(file_path) > DIFF_MAX_BYTES:
+            return None
+        with open(file_path, "rb") as f:
+            return f.read().decode("utf-8", errors="replace")
+    except OSError:
+        return None
+
+
+def get_changed_regions(tool_name, tool_input, content):
+    """Return the spans of `content` that the edit actually changes.
+
+    Returns None when the whole content has to be scanned: new files, files too
+    large to diff, or rules with literals spanning lines.
+    """
+    if get_content_matcher()["multiline"]:
+        return None
+
+    if tool_name == "Write":
+        old_text = read_existing_text(tool_input.get("file_path", ""))
+        if old_text is None:
+            return None
+        if old_text == content:
+            return []
+        return diff_regions(old_text, content)
+    elif tool_name == "Edit":
+        return diff_regions(tool_input.get("old_string", ""), content)
+    elif tool_name == "MultiEdit":
+        # Mirrors extract_content_from_input: new strings joined by single spaces
+        regions = []
+        base = 0
+        for edit in tool_input.get("edits", []):
+            new_string = edit.get("new_string", "")
+            regions.extend(diff_regions(edit.get("old_string", ""), new_string, base))
+            base += len(new_string) + 1
+        return regions
+
+    return None
 
 
 def extract_content_from_input(tool_name, tool_input):
@@ -214,26 +752,17 @@ def extract_content_from_input(tool_name, tool_input):
     return ""
 
 
-def main():
-    """Main hook function."""
-    # Check if security reminders are enabled
-    security_reminder_enabled = os.environ.get("ENABLE_SECURITY_REMINDER", "1")
+def run_hook(raw_input):
+    """Run the hook on a raw PreToolUse payload.
 
-    # Only run if security reminders are enabled
-    if security_reminder_enabled == "0":
-        sys.exit(0)
-
-    # Periodically clean up old state files (10% chance per run)
-    if random.random() < 0.1:
-        cleanup_old_state_files()
-
-    # Read input from stdin
+    Returns (exit_code, stderr_text) so the same logic serves both the one-shot
+    script and the resident daemon.
+    """
     try:
-        raw_input = sys.stdin.read()
         input_data = json.loads(raw_input)
-    except json.JSONDecodeError as e:
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
         debug_log(f"JSON decode error: {e}")
-        sys.exit(0)  # Allow tool to proceed if we can't parse input
+        return 0, ""  # Allow tool to proceed if we can't parse input
 
     # Extract session ID and tool information from the hook input
     session_id = input_data.get("session_id", "default")
@@ -242,39 +771,339 @@ def main():
 
     # Check if this is a relevant tool
     if tool_name not in ["Edit", "Write", "MultiEdit"]:
-        sys.exit(0)  # Allow non-file tools to proceed
+        return 0, ""  # Allow non-file tools to proceed
 
     # Extract file path from tool_input
     file_path = tool_input.get("file_path", "")
     if not file_path:
-        sys.exit(0)  # Allow if no file path
+        return 0, ""  # Allow if no file path
 
     # Extract content to check
     content = extract_content_from_input(tool_name, tool_input)
 
+    # Only scan what the edit changes, so unchanged matches don't fire again
+    regions = get_changed_regions(tool_name, tool_input, content)
+
     # Check for security patterns
-    rule_name, reminder = check_patterns(file_path, content)
+    matched_rules = check_patterns(file_path, content, regions)
 
-    if rule_name and reminder:
-        # Create unique warning key
-        warning_key = f"{file_path}-{rule_name}"
+    if matched_rules:
+        rule_names = [rule["ruleName"] for rule in matched_rules]
+        try:
+            new_rules = mark_warnings_shown(session_id, file_path, rule_names)
+        except Exception as e:
+            debug_log(f"Failed to update state database: {e}")
+            new_rules = rule_names  # Warn rather than stay silent
 
-        # Load existing warnings for this session
-        shown_warnings = load_state(session_id)
+        # Only warn about rules not already shown for this file in this session
+        reminders = [get_reminder(rule) for rule in matched_rules if rule["ruleName"] in new_rules]
+        if reminders:
+            # Block tool execution (exit code 2 for PreToolUse hooks)
+            return 2, "\n\n".join(reminders)
 
-        # Check if we've already shown this warning in this session
-        if warning_key not in shown_warnings:
-            # Add to shown warnings and save
-            shown_warnings.add(warning_key)
-            save_state(session_id, shown_warnings)
+    # Allow tool to proceed
+    return 0, ""
 
-            # Output the warning to stderr and block execution
-            print(reminder, file=sys.stderr)
-            sys.exit(2)  # Block tool execution (exit code 2 for PreToolUse hooks)
 
-    # Allow tool to proceed
-    sys.exit(0)
+def serve():
+    """Run the hook as a resident Unix-socket daemon.
+
+    Each connection carries one raw hook payload and gets back the exit code on
+    the first line followed by the stderr text. The daemon exits after
+    DAEMON_IDLE_TIMEOUT seconds without requests, or once this script changes
+    on disk so the next client starts a fresh one. While running it also drives
+    state cleanup at the fixed STATE_CLEANUP_INTERVAL cadence.
+    """
+    import fcntl
+    import socketserver
+    import threading
+    import time
+
+    os.makedirs(os.path.dirname(SOCKET_PATH), exist_ok=True)
+    lock_file = open(DAEMON_LOCK_FILE, "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return  # Another daemon is already serving
+
+    if os.path.exists(SOCKET_PATH):
+        os.remove(SOCKET_PATH)
+
+    last_request = [time.monotonic()]
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            last_request[0] = time.monotonic()
+            try:
+                refresh_rules()  # Pick up edited or added rule packs
+                exit_code, stderr = run_hook(self.rfile.read())
+            except Exception as e:
+                debug_log(f"Daemon request failed: {e}")
+                return  # The client falls back to the in-process path
+            self.wfile.write(f"{exit_code}\n{stderr}".encode())
+
+    class Server(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+    def watchdog(server):
+        script_mtime = os.path.getmtime(__file__)
+        next_cleanup = time.monotonic()
+        while True:
+            if time.monotonic() >= next_cleanup:
+                cleanup_old_state_files()
+                next_cleanup = time.monotonic() + STATE_CLEANUP_INTERVAL
+            time.sleep(DAEMON_WATCH_INTERVAL)
+            try:
+                changed = os.path.getmtime(__file__) != script_mtime
+            except OSError:
+                changed = True
+            idle = time.monotonic() - last_request[0] > DAEMON_IDLE_TIMEOUT
+            if changed or idle:
+                server.shutdown()
+                return
+
+    os.umask(0o077)
+    with Server(SOCKET_PATH, Handler) as server:
+        threading.Thread(target=watchdog, args=(server,), daemon=True).start()
+        try:
+            server.serve_forever()
+        finally:
+            try:
+                os.remove(SOCKET_PATH)
+            except OSError:
+                pass
+
+
+def iter_scan_paths(root):
+    """Yield file paths under root, relative to it, honoring .gitignore.
+
+    Inside a git work tree this streams `git ls-files`, which applies every
+    ignore source exactly as git does; elsewhere it falls back to a walk.
+    """
+    import subprocess
+
+    try:
+        proc = subprocess.Popen(
+            ["git", "-C", root, "ls-files", "-z", "--cached", "--others", "--exclude-standard"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+    except OSError:
+        proc = None
+
+    if proc:
+        yielded = False
+        pending = b""
+        for chunk in iter(lambda: proc.stdout.read(65536), b""):
+            *paths, pending = (pending + chunk).split(b"\0")
+            for path in paths:
+                yielded = True
+                yield os.fsdecode(path)
+        if proc.wait() == 0 or yielded:
+            return
+
+    yield from walk_scan_paths(root)
+
+
+def read_gitignore(directory, rel_dir):
+    """Parse a .gitignore into (base, pattern, dir_only, anchored) rules."""
+    rules = []
+    try:
+        with open(os.path.join(directory, ".gitignore"), errors="replace") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return rules
+
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith(("#", "!")):
+            continue  # Negations are not supported by the fallback walk
+        dir_only = line.endswith("/")
+        pattern = line.rstrip("/")
+        anchored = "/" in pattern
+        rules.append((rel_dir, pattern.lstrip("/"), dir_only, anchored))
+    return rules
+
+
+def walk_scan_paths(root):
+    """Walk a non-git tree, applying basic .gitignore rules (no negation)."""
+    import fnmatch
+
+    stack = [("", [])]
+    while stack:
+        rel_dir, rules = stack.pop()
+        abs_dir = os.path.join(root, rel_dir)
+        rules = rules + read_gitignore(abs_dir, rel_dir)
+        try:
+            entries = list(os.scandir(abs_dir))
+        except OSError:
+            continue
+
+        for entry in entries:
+            if entry.name == ".git":
+                continue
+            rel_path = os.path.join(rel_dir, entry.name)
+            is_dir = entry.is_dir(follow_symlinks=False)
+
+            ignored = False
+            for base, pattern, dir_only, anchored in rules:
+                if dir_only and not is_dir:
+                    continue
+                if anchored:
+                    subject = rel_path[len(base) + 1 :] if base else rel_path
+                else:
+                    subject = entry.name
+                if fnmatch.fnmatch(subject, pattern):
+                    ignored = True
+                    break
+            if ignored:
+                continue
+
+            if is_dir:
+                stack.append((rel_path, rules))
+            elif entry.is_file(follow_symlinks=False):
+                yield rel_path
+
+
+_buffer_matcher = None
+
+
+def scan_batch(root, rel_paths):
+    """Scan a batch of files in a worker process.
+
+    Returns (findings, stats), where findings holds one record per file with
+    matches and stats counts files, bytes, binaries and errors.
+    """
+    import mmap
+    import stat
+
+    global _buffer_matcher
+    if _buffer_matcher is None:
+        _buffer_matcher = encode_matcher(get_content_matcher())
+
+    findings = []
+    stats = {"files": 0, "bytes": 0, "binary": 0, "errors": 0}
+    for rel_path in rel_paths:
+        matches = find_matches(rel_path, "")
+        try:
+            with open(os.path.join(root, rel_path), "rb") as f:
+                info = os.fstat(f.fileno())
+                if not stat.S_ISREG(info.st_mode):
+                    continue
+                if info.st_size:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                        if b"\0" in buffer[:SCAN_BINARY_SNIFF]:
+                            stats["binary"] += 1
+                            continue
+                        matches.extend(find_buffer_matches(buffer, _buffer_matcher))
+        except (OSError, ValueError):
+            stats["errors"] += 1
+            continue
+
+        stats["files"] += 1
+        stats["bytes"] += info.st_size
+        if matches:
+            findings.append(
+                {
+                    "path": rel_path,
+                    "rules": sorted({rule_name for rule_name, _ in matches}),
+                    "total_matches": len(matches),
+                    "matches": [
+                        {"rule": rule_name, "offset": offset}
+                        for rule_name, offset in matches[:SCAN_MAX_MATCHES]
+                    ],
+                }
+            )
+    return findings, stats
+
+
+def scan():
+    """Apply the hook's rules to every file under a directory.
+
+    Findings stream to stdout as JSON lines (byte offsets); a throughput
+    summary goes to stderr at the end.
+    """
+    import argparse
+    import itertools
+    import time
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    parser = argparse.ArgumentParser(
+        prog="security_reminder_hook.py scan",
+        description="Apply the security reminder rules to every file under a directory",
+    )
+    parser.add_argument("root", nargs="?", default=".", help="Directory to scan (default: .)")
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=os.cpu_count() or 1, help="Worker processes"
+    )
+    args = parser.parse_args(sys.argv[2:])
+    root = os.path.abspath(args.root)
+
+    totals = {"files": 0, "bytes": 0, "binary": 0, "errors": 0, "flagged": 0}
+
+    def emit(futures):
+        for future in futures:
+            findings, stats = future.result()
+            for finding in findings:
+                sys.stdout.write(json.dumps(finding) + "\n")
+            sys.stdout.flush()
+            for key, value in stats.items():
+                totals[key] += value
+            totals["flagged"] += len(findings)
+
+    start = time.perf_counter()
+    paths = iter_scan_paths(root)
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        pending = set()
+        while batch := list(itertools.islice(paths, SCAN_BATCH_SIZE)):
+            pending.add(pool.submit(scan_batch, root, batch))
+            # Bound in-flight work so huge trees stream instead of queueing
+            if len(pending) >= args.jobs * 4:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                emit(done)
+        emit(wait(pending).done)
+    elapsed = time.perf_counter() - start
+
+    megabytes = totals["bytes"] / (1024 * 1024)
+    print(
+        f"Scanned {totals['files']} files ({megabytes:.1f} MB) in {elapsed:.2f}s: "
+        f"{totals['files'] / elapsed:.0f} files/s, {megabytes / elapsed:.1f} MB/s; "
+        f"{totals['flagged']} flagged, {totals['binary']} binary skipped, "
+        f"{totals['errors']} unreadable",
+        file=sys.stderr,
+    )
+
+
+def print_stats():
+    """Print verdict cache counters as JSON."""
+    print(json.dumps({"verdict_cache": verdict_cache_stats()}, indent=2))
+
+
+def main():
+    """Main hook function."""
+    # Check if security reminders are enabled
+    security_reminder_enabled = os.environ.get("ENABLE_SECURITY_REMINDER", "1")
+
+    # Only run if security reminders are enabled
+    if security_reminder_enabled == "0":
+        sys.exit(0)
+
+    exit_code, stderr = run_hook(sys.stdin.read())
+    if stderr:
+        print(stderr, file=sys.stderr)
+    sys.exit(exit_code)
+
+
+# Subcommands; with no arguments the script runs as the hook itself
+COMMANDS = {
+    "scan": scan,
+    "serve": serve,
+    "stats": print_stats,
+}
 
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        COMMANDS[sys.argv[1]]()
+    else:
+        main()
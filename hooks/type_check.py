@@ -1,46 +1,1863 @@
+#!/usr/bin/env python3
+"""
+Type Check Hook for Claude Code
+Type-checks edited source files and feeds errors back to Claude (exit code 2).
+
+Each language has an entry in CHECKERS: TypeScript (tsserver), Python
+(pyright language server), Rust (`cargo check`) and Go (`go vet`). Checks go
+to a long-lived checker per project and language, which keeps its state warm
+and re-checks only what changed. A small daemon owns it
+(`type_check.py serve <checker> <project_root>`); the hook starts it on first
+use and it exits when idle. Bursts of edits are coalesced into batched
+checks, and at most TYPE_CHECK_MAX_CHECKERS checks run machine-wide at once.
+Without a warm checker, or when the daemon can't be reached, the hook falls
+back to a cold run (e.g. `npx tsc`). Every checker reports in the same
+`file(line,col): severity CODE: message` format.
+
+Reports cover the edited file and its direct dependents (files importing
+it, at most TYPE_CHECK_MAX_DEPENDENTS of them), edited file first, capped at
+TYPE_CHECK_MAX_DIAGNOSTICS. Checker output
+is parsed as it streams and the checker is stopped once the cap is reached.
+
+TypeScript reports are cached by a hash of the file, its transitive imports
+and the project config, so reverting and re-applying an edit skips the check.
+"""
+
+import contextlib
+import hashlib
 import json
-import sys
-import subprocess
+import os
 import re
+import subprocess
+import sys
+
+# Per-project daemon settings
+DAEMON_DIR = os.path.expanduser("~/.claude/type_check")
+DAEMON_IDLE_TIMEOUT = 15 * 60  # Seconds without requests before the checker is shut down
+DAEMON_START_TIMEOUT = 15  # Seconds to wait for a new daemon to start listening
+DAEMON_RETRY_DELAY = 60  # Seconds after a failed start before another is attempted
+DAEMON_WATCH_INTERVAL = 5  # Seconds between idle checks
+CHECK_TIMEOUT = 120  # Seconds to wait for diagnostics (the first check loads the project)
+
+# Coalescing of check bursts (e.g. an agent editing many files in a row)
+CHECK_DEBOUNCE = 0.15  # Seconds of quiet before a batch of pending files is checked
+CHECK_MAX_DELAY = 1.0  # Upper bound on how long a burst can hold back its batch
+MAX_CHECKERS = int(os.environ.get("TYPE_CHECK_MAX_CHECKERS", 0)) or max(1, (os.cpu_count() or 2) // 2)
+
+# Reporting
+MAX_DIAGNOSTICS = int(os.environ.get("TYPE_CHECK_MAX_DIAGNOSTICS", 0)) or 25  # Per edit, ranked
+TAIL_LINES = 10  # Lines of output shown when a checker fails without diagnostics
+MAX_DEPENDENTS = int(os.environ.get("TYPE_CHECK_MAX_DEPENDENTS", 0)) or 50  # Importers checked with an edit
+
+# Checker-specific settings
+SKIP_DIRS = {"node_modules", "__pycache__", "venv", "target"}  # Never scanned for sources (nor dot dirs)
+CARGO_TARGET_DIR = os.path.join("target", "type-check")  # Incremental build dir, apart from the user's builds
+GO_DIAGNOSTIC = re.compile(r"^(?:vet: )?(.+?\.go):(\d+):(?:(\d+):)? (.*)$")
+GO_MODULE = re.compile(rb"^module\s+(\S+)", re.M)
+GO_STRING = re.compile(rb'"([^"\n]+)"')
+RUST_MODULE_REFERENCE = re.compile(rb"\bmod\s+(\w+)|\b(\w+)::")
+TSC_DIAGNOSTIC = re.compile(r"^(.+?)\((\d+),(\d+)\): error (TS\d+): (.*)$")
+TSC_GLOBAL_ERROR = re.compile(r"^error (TS\d+): (.*)$")
+PYTHON_IMPORT = re.compile(
+    rb"^[ \t]*(?:from[ \t]+(\.*[\w.]*)[ \t]+import[ \t]+\(?([\w \t,*]+)|import[ \t]+([\w \t,.]+))", re.M
+)
+
+# Content-addressed diagnostics cache
+CACHE_DB = os.path.join(DAEMON_DIR, "diagnostics_cache.db")
+CACHE_BUSY_TIMEOUT = 10  # Seconds a writer waits for the database lock
+CACHE_MAX_BYTES = 8 * 1024 * 1024  # Stored report size kept before LRU eviction
+CACHE_MAX_FILES = 50_000  # Per-file digests kept before LRU eviction
+CACHE_VERSION = 2  # Part of every key; bumped when the stored report format changes
+PACKAGE_FILES = ("package.json", "package-lock.json", "npm-shrinkwrap.json", "yarn.lock", "pnpm-lock.yaml", "bun.lockb")
+SOURCE_EXTENSIONS = (".ts", ".tsx", ".d.ts", ".mts", ".cts", ".js", ".jsx")
+TYPESCRIPT_SOURCES = (".ts", ".tsx", ".mts", ".cts")  # Files scanned for importers of an edited file
+IMPORT_PATTERN = re.compile(
+    rb"""(?:\bfrom|\bimport\s*\(?|\brequire\s*\(|<reference\s+path\s*=)\s*["']([^"'\n]+)["']"""
+)
+JSONC_NOISE = re.compile(r'("(?:\\.|[^"\\])*")|//[^\n]*|/\*.*?\*/', re.S)
+
+
+@contextlib.contextmanager
+def checker_slot():
+    """Hold one of MAX_CHECKERS machine-wide slots while a checker runs.
+
+    Slots are flock'd files, so they are shared by every daemon and cold run
+    and are released automatically if the holder dies.
+    """
+    import fcntl
+    import time
+
+    os.makedirs(DAEMON_DIR, exist_ok=True)
+    while True:
+        for index in range(MAX_CHECKERS):
+            slot = open(os.path.join(DAEMON_DIR, f"slot-{index}.lock"), "w")
+            try:
+                fcntl.flock(slot, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                slot.close()
+                continue
+            try:
+                yield
+            finally:
+                slot.close()
+            return
+        time.sleep(0.05)
+
+
+def find_project_root(file_path, markers):
+    """Return the nearest directory holding one of the marker files, else the file's directory."""
+    directory = os.path.dirname(os.path.abspath(file_path))
+    current = directory
+    while True:
+        if any(os.path.isfile(os.path.join(current, marker)) for marker in markers):
+            return current
+        parent = os.path.dirname(current)
+        if parent == current:
+            return directory
+        current = parent
+
+
+def find_tsserver(project_root):
+    """Return the project's node_modules/typescript/lib/tsserver.js, if installed."""
+    current = project_root
+    while True:
+        candidate = os.path.join(current, "node_modules", "typescript", "lib", "tsserver.js")
+        if os.path.isfile(candidate):
+            return candidate
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None
+        current = parent
+
+
+def find_node_tool(project_root, names):
+    """Return the first of the named executables in node_modules/.bin or on PATH."""
+    import shutil
+
+    current = project_root
+    while True:
+        for name in names:
+            candidate = os.path.join(current, "node_modules", ".bin", name)
+            if os.access(candidate, os.X_OK):
+                return candidate
+        parent = os.path.dirname(current)
+        if parent == current:
+            break
+        current = parent
+    for name in names:
+        found = shutil.which(name)
+        if found:
+            return found
+    return None
+
+
+def find_pyright_langserver(project_root):
+    return find_node_tool(project_root, ("basedpyright-langserver", "pyright-langserver"))
+
+
+def find_cargo(project_root):
+    import shutil
+
+    return shutil.which("cargo")
+
+
+def find_go(project_root):
+    import shutil
+
+    return shutil.which("go")
+
+
+def walk_files(root, suffixes):
+    """Yield source files under root, skipping dependency, build and dot directories."""
+    stack = [root]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in SKIP_DIRS and not entry.name.startswith("."):
+                    stack.append(entry.path)
+            elif entry.name.endswith(suffixes):
+                yield entry.path
+
+
+def read_sources(project_root, suffixes, scan):
+    """Yield (path, scan(content)) for each source file under project_root."""
+    for path in walk_files(project_root, suffixes):
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+        except OSError:
+            continue
+        yield path, scan(content)
+
+
+def daemon_paths(checker, project_root):
+    """Return the (socket, lock file) paths of a project's daemon for one checker.
+
+    The diagnostics cap is part of the identity, since the daemon applies the
+    cap it was started with.
+    """
+    key = hashlib.sha1(f"{checker}\0{project_root}\0{MAX_DIAGNOSTICS}".encode()).hexdigest()[:16]
+    return os.path.join(DAEMON_DIR, f"{key}.sock"), os.path.join(DAEMON_DIR, f"{key}.lock")
+
+
+def send_request(socket_path, request):
+    """Send one JSON request to a daemon and return its JSON reply."""
+    import socket
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(CHECK_TIMEOUT + 5)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        sock.shutdown(socket.SHUT_WR)
+        chunks = []
+        while chunk := sock.recv(65536):
+            chunks.append(chunk)
+    return json.loads(b"".join(chunks))
+
+
+def start_daemon(checker, project_root):
+    """Launch the project's daemon detached and wait until it accepts connections.
+
+    A failed start is remembered for DAEMON_RETRY_DELAY seconds (the mtime
+    of a .failed marker next to the lock file); until then this fails at
+    once, so edits go straight to the cold path instead of waiting again.
+    """
+    import socket
+    import time
+
+    socket_path, lock_path = daemon_paths(checker, project_root)
+    failed_path = os.path.splitext(lock_path)[0] + ".failed"
+    try:
+        if time.time() - os.path.getmtime(failed_path) < DAEMON_RETRY_DELAY:
+            raise OSError("type check daemon failed to start recently")
+    except FileNotFoundError:
+        pass
+
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "serve", checker, project_root],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + DAEMON_START_TIMEOUT
+    # A clean exit means another daemon holds the lock and is starting, so keep waiting
+    while time.monotonic() < deadline and not process.poll():
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(socket_path)
+            except OSError:
+                time.sleep(0.05)  # Not listening yet, or a stale socket from a dead daemon
+                continue
+        try:
+            os.remove(failed_path)
+        except OSError:
+            pass
+        return
+    try:
+        os.makedirs(DAEMON_DIR, exist_ok=True)
+        with open(failed_path, "w") as f:
+            f.write(f"{time.time()}\n")
+    except OSError:
+        pass
+    raise OSError("type check daemon did not start")
+
+
+def check_with_daemon(checker, project_root, file_path):
+    """Return a file's report from the project's warm checker."""
+    socket_path, _ = daemon_paths(checker, project_root)
+    request = {"file": file_path}
+    try:
+        reply = send_request(socket_path, request)
+    except (ConnectionRefusedError, FileNotFoundError):
+        # No daemon listening; a timeout or dropped reply is not retried
+        start_daemon(checker, project_root)
+        reply = send_request(socket_path, request)
+
+    if "error" in reply:
+        raise RuntimeError(reply["error"])
+    return reply
+
+
+def format_diagnostic(file_path, diagnostic):
+    """Format a diagnostic the way tsc prints it, whichever checker produced it.
+
+    Diagnostics are dicts with 1-based "line" and "column", plus "severity",
+    "code" (may be empty) and "message".
+    """
+    code = f" {diagnostic['code']}" if diagnostic["code"] else ""
+    return (
+        f"{file_path}({diagnostic['line']},{diagnostic['column']}): "
+        f"{diagnostic['severity']}{code}: {diagnostic['message']}"
+    )
+
+
+def read_message(stream):
+    """Read one Content-Length framed JSON message, or None at end of stream."""
+    length = None
+    while True:
+        line = stream.readline()
+        if not line:
+            return None
+        line = line.strip()
+        if not line:
+            if length is not None:
+                break
+            continue
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+    return json.loads(stream.read(length))
+
+
+class DiagnosticBudget:
+    """Collects the diagnostics worth reporting for one edited file, ranked and bounded.
+
+    Only the edited file and its direct dependents count, and the edited
+    file's own diagnostics rank first. At most MAX_DIAGNOSTICS of each are
+    held, so memory stays bounded however much a checker prints.
+    """
+
+    def __init__(self, file_path, dependents=()):
+        self.file_path = file_path
+        self.dependents = set(dependents)
+        self.own = []
+        self.others = []
+        self.omitted = 0
+        self.stopped = False  # The checker was cut off, so the omitted count is a floor
+        self.failed = False  # The checker itself failed, so the report must not be cached
+
+    def add(self, diagnostic):
+        if diagnostic["file"] == self.file_path:
+            bucket = self.own
+        elif diagnostic["file"] in self.dependents:
+            bucket = self.others
+        else:
+            return
+        if len(bucket) < MAX_DIAGNOSTICS:
+            bucket.append(diagnostic)
+        else:
+            self.omitted += 1
+
+    def fail(self, message):
+        """Report a checker failure against the edited file."""
+        self.failed = True
+        self.own.insert(0, {
+            "file": self.file_path,
+            "line": 1,
+            "column": 1,
+            "severity": "error",
+            "code": "",
+            "message": message,
+        })
+        del self.own[MAX_DIAGNOSTICS:]
+
+    def full(self):
+        """True once nothing the checker prints later could make the report."""
+        return len(self.own) >= MAX_DIAGNOSTICS
+
+    def report(self):
+        ranked = sorted(self.own, key=lambda d: (d["line"], d["column"]))
+        ranked += sorted(self.others, key=lambda d: (d["file"], d["line"], d["column"]))
+        omitted = self.omitted + max(0, len(ranked) - MAX_DIAGNOSTICS)
+        note = None
+        if self.stopped:
+            note = f"... more diagnostics not shown (checking stopped after {MAX_DIAGNOSTICS})"
+        elif omitted:
+            note = f"... {omitted} more diagnostics not shown"
+        return {"diagnostics": ranked[:MAX_DIAGNOSTICS], "note": note, "failed": self.failed}
+
+
+def budget_reports(requests, diagnostics):
+    """Build each requested file's report from diagnostics grouped by file."""
+    reports = {}
+    for path, dependents in requests.items():
+        budget = DiagnosticBudget(path, dependents)
+        for file in (path, *dependents):
+            for diagnostic in diagnostics.get(file, ()):
+                budget.add(diagnostic)
+        reports[path] = budget.report()
+    return reports
+
+
+def stream_diagnostics(argv, cwd, parse, budgets, env=None, started=None):
+    """Run a checker, feeding its output into the budgets line by line.
+
+    parse(line) returns a new diagnostic, a continuation line for the previous
+    one, or None. The checker is killed as soon as every budget is full.
+    started(stop), if given, receives a function that kills the checker.
+    Returns (exit code, diagnostics seen, last unparsed lines); the exit code
+    is None if the checker was stopped.
+    """
+    import collections
+    import signal
+    import threading
+
+    process = subprocess.Popen(
+        argv,
+        cwd=cwd,
+        env=env,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        errors="replace",
+        start_new_session=True,  # Own process group, so wrappers like npx die with their child
+    )
+
+    def stop():
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+    if started is not None:
+        started(stop)
+    timer = threading.Timer(CHECK_TIMEOUT, stop)
+    timer.start()
+    tail = collections.deque(maxlen=TAIL_LINES)
+    current = None
+    seen = 0
+    stopped = False
+    try:
+        for line in process.stdout:
+            line = line.rstrip("\n")
+            parsed = parse(line)
+            if isinstance(parsed, str):
+                if current is not None:
+                    current["message"] += "\n" + parsed
+                continue
+            if parsed is None:
+                if not line.startswith("{"):
+                    tail.append(line)
+                continue
+            seen += 1
+            if current is not None:
+                for budget in budgets:
+                    budget.add(current)
+                if all(budget.full() for budget in budgets):
+                    stopped = True
+                    break
+            current = parsed
+        else:
+            if current is not None:
+                for budget in budgets:
+                    budget.add(current)
+    finally:
+        timer.cancel()
+        if stopped:
+            stop()
+            for budget in budgets:
+                budget.stopped = True
+        process.stdout.close()
+        returncode = process.wait()
+    return (None if stopped else returncode), seen, list(tail)
+
+
+class CheckCancelled(Exception):
+    """A check was abandoned because a newer request superseded it."""
+
+
+class TsServer:
+    """Minimal tsserver client: JSON-line requests in, Content-Length framed messages out."""
+
+    def __init__(self, project_root):
+        import queue
+        import threading
+
+        self.project_root = project_root
+        self.process = subprocess.Popen(
+            ["node", find_tsserver(project_root), "--disableAutomaticTypingAcquisition"],
+            cwd=project_root,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self.seq = 0
+        self.events = queue.Queue()
+        self.lock = threading.Lock()
+        self.open_files = {}  # Path -> mtime_ns of the content tsserver holds
+        threading.Thread(target=self._read_messages, daemon=True).start()
+
+    def _send(self, command, arguments):
+        self.seq += 1
+        message = {"seq": self.seq, "type": "request", "command": command, "arguments": arguments}
+        self.process.stdin.write(json.dumps(message).encode() + b"\n")
+        self.process.stdin.flush()
+        return self.seq
+
+    def _read_messages(self):
+        while True:
+            message = read_message(self.process.stdout)
+            if message is None:
+                self.events.put(None)  # tsserver exited
+                return
+            if message.get("type") == "event":
+                self.events.put(message)
+
+    def _reopen(self, path):
+        """Make tsserver re-read a file from disk by closing and reopening it."""
+        if path in self.open_files:
+            self._send("close", {"file": path})
+            del self.open_files[path]
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return
+        self._send("open", {"file": path, "projectRootPath": self.project_root})
+        self.open_files[path] = mtime
+
+    def check(self, requests):
+        """Return {path: report} for {path: dependents}, in one geterr run."""
+        import queue
+
+        files = list(dict.fromkeys([*requests, *(d for deps in requests.values() for d in deps)]))
+        with self.lock:
+            # Open files shadow the disk, so refresh any that changed since
+            for path, mtime in list(self.open_files.items()):
+                try:
+                    changed = os.stat(path).st_mtime_ns != mtime
+                except OSError:
+                    changed = True
+                if changed and path not in files:
+                    self._reopen(path)
+            for path in files:
+                self._reopen(path)
+
+            while not self.events.empty():
+                self.events.get_nowait()  # Drop leftovers from an abandoned request
+
+            seq = self._send("geterr", {"files": files, "delay": 0})
+            diagnostics = {path: [] for path in files}
+            while True:
+                try:
+                    event = self.events.get(timeout=CHECK_TIMEOUT)
+                except queue.Empty:
+                    raise RuntimeError("tsserver timed out")
+                if event is None:
+                    raise RuntimeError("tsserver exited")
+                name = event.get("event")
+                if name == "cancelled":
+                    raise CheckCancelled()
+                body = event.get("body") or {}
+                if name in ("syntaxDiag", "semanticDiag") and body.get("file") in diagnostics:
+                    diagnostics[body["file"]].extend(
+                        {
+                            "file": body["file"],
+                            "line": d["start"]["line"],
+                            "column": d["start"]["offset"],
+                            "severity": "error",
+                            "code": f"TS{d['code']}",
+                            "message": d["text"],
+                        }
+                        for d in body.get("diagnostics", [])
+                        if d.get("category") == "error"
+                    )
+                elif name == "requestCompleted" and body.get("request_seq") == seq:
+                    return budget_reports(requests, diagnostics)
+
+    def cancel(self):
+        """Abandon the geterr in flight; tsserver drops it when the next geterr arrives."""
+        self.events.put({"type": "event", "event": "cancelled"})
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def close(self):
+        self.process.kill()
+        self.process.wait()
+
+
+def path_to_uri(path):
+    from urllib.parse import quote
+
+    return "file://" + quote(path)
+
+
+class PyrightServer:
+    """Minimal LSP client for pyright-langserver (or basedpyright) in --stdio mode."""
+
+    def __init__(self, project_root):
+        import threading
+
+        self.project_root = project_root
+        self.process = subprocess.Popen(
+            [find_pyright_langserver(project_root), "--stdio"],
+            cwd=project_root,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self.next_id = 0
+        self.lock = threading.Lock()  # One check at a time
+        self.write_lock = threading.Lock()  # The reader thread answers server requests too
+        self.condition = threading.Condition()
+        self.responses = {}  # Request id -> response
+        self.published = {}  # URI -> (document version, diagnostics)
+        self.documents = {}  # Path -> (version, mtime_ns) of open documents
+        self.cancelled = False  # Set to abandon the check in flight
+        # pyright only learns about edits to unopened files through watched-file events
+        self.mtimes = self._snapshot()
+        threading.Thread(target=self._read_messages, daemon=True).start()
+
+        root_uri = path_to_uri(project_root)
+        self._request("initialize", {
+            "processId": os.getpid(),
+            "rootUri": root_uri,
+            "workspaceFolders": [{"uri": root_uri, "name": os.path.basename(project_root)}],
+            "capabilities": {
+                "textDocument": {"publishDiagnostics": {"versionSupport": True}},
+                "workspace": {"configuration": True, "didChangeWatchedFiles": {"dynamicRegistration": True}},
+            },
+        })
+        self._notify("initialized", {})
+
+    def _snapshot(self):
+        mtimes = {}
+        for path in walk_files(self.project_root, (".py", ".pyi")):
+            try:
+                mtimes[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                pass
+        return mtimes
+
+    def _write(self, message):
+        data = json.dumps(message).encode()
+        with self.write_lock:
+            self.process.stdin.write(b"Content-Length: %d\r\n\r\n" % len(data) + data)
+            self.process.stdin.flush()
+
+    def _notify(self, method, params):
+        self._write({"jsonrpc": "2.0", "method": method, "params": params})
+
+    def _request(self, method, params):
+        with self.condition:
+            self.next_id += 1
+            request_id = self.next_id
+        self._write({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+        with self.condition:
+            if not self.condition.wait_for(
+                lambda: request_id in self.responses or not self.alive(), CHECK_TIMEOUT
+            ) or request_id not in self.responses:
+                raise RuntimeError(f"pyright did not answer {method}")
+            return self.responses.pop(request_id)
+
+    def _read_messages(self):
+        while True:
+            message = read_message(self.process.stdout)
+            if message is None:
+                with self.condition:
+                    self.process.wait()
+                    self.condition.notify_all()
+                return
+            method = message.get("method")
+            if method and "id" in message:
+                # Server requests: default configuration, accept registrations
+                params = message.get("params") or {}
+                result = [None] * len(params.get("items", [])) if method == "workspace/configuration" else None
+                self._write({"jsonrpc": "2.0", "id": message["id"], "result": result})
+            elif method == "textDocument/publishDiagnostics":
+                params = message["params"]
+                with self.condition:
+                    self.published[params["uri"]] = (params.get("version") or 0, params["diagnostics"])
+                    self.condition.notify_all()
+            elif "id" in message:
+                with self.condition:
+                    self.responses[message["id"]] = message
+                    self.condition.notify_all()
+
+    def _sync(self, path):
+        """Send a document's current disk content and return its new version."""
+        uri = path_to_uri(path)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            with open(path, encoding="utf-8", errors="replace") as f:
+                text = f.read()
+        except OSError:
+            if path in self.documents:
+                self._notify("textDocument/didClose", {"textDocument": {"uri": uri}})
+                del self.documents[path]
+            return None
+        if path in self.documents:
+            version = self.documents[path][0] + 1
+            self._notify("textDocument/didChange", {
+                "textDocument": {"uri": uri, "version": version},
+                "contentChanges": [{"text": text}],
+            })
+        else:
+            version = 1
+            self._notify("textDocument/didOpen", {
+                "textDocument": {"uri": uri, "languageId": "python", "version": version, "text": text},
+            })
+        self.documents[path] = (version, mtime)
+        return version
+
+    def check(self, requests):
+        """Return {path: report} for {path: dependents}; dependents are opened too."""
+        files = list(dict.fromkeys([*requests, *(d for deps in requests.values() for d in deps)]))
+        with self.lock:
+            current = self._snapshot()
+            changes = []
+            for path in current.keys() | self.mtimes.keys():
+                before, after = self.mtimes.get(path), current.get(path)
+                if before != after and path not in self.documents:
+                    kind = 1 if before is None else 3 if after is None else 2  # Created/deleted/changed
+                    changes.append({"uri": path_to_uri(path), "type": kind})
+            self.mtimes = current
+            if changes:
+                self._notify("workspace/didChangeWatchedFiles", {"changes": changes})
+
+            # Open documents shadow the disk, so resync any edited since
+            for path, (_, mtime) in list(self.documents.items()):
+                if path not in files and current.get(path) != mtime:
+                    self._sync(path)
+            expected = {path: self._sync(path) for path in files}
+
+            def published():
+                return all(
+                    version is None or self.published.get(path_to_uri(path), (0,))[0] >= version
+                    for path, version in expected.items()
+                )
+
+            with self.condition:
+                self.cancelled = False
+                if not self.condition.wait_for(
+                    lambda: published() or self.cancelled or not self.alive(), CHECK_TIMEOUT
+                ):
+                    raise RuntimeError("pyright timed out")
+                if self.cancelled:
+                    raise CheckCancelled()
+                if not published():
+                    raise RuntimeError("pyright exited")
+                results = {}
+                for path in files:
+                    _, diagnostics = self.published.get(path_to_uri(path), (0, []))
+                    results[path] = [
+                        {
+                            "file": path,
+                            "line": d["range"]["start"]["line"] + 1,
+                            "column": d["range"]["start"]["character"] + 1,
+                            "severity": "error",
+                            "code": str(d.get("code") or ""),
+                            "message": d["message"],
+                        }
+                        for d in diagnostics
+                        if d.get("severity", 1) == 1
+                    ]
+                return budget_reports(requests, results)
+
+    def cancel(self):
+        """Stop waiting for the check in flight; the next sync supersedes its analysis."""
+        with self.condition:
+            self.cancelled = True
+            self.condition.notify_all()
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def close(self):
+        self.process.kill()
+        self.process.wait()
+
+
+class CommandChecker:
+    """Base for checkers that run a build tool per batch and rely on its own caches."""
+
+    def __init__(self, project_root):
+        import threading
+
+        self.project_root = project_root
+        self.lock = threading.Lock()
+        self.stop = None  # Kills the run in flight
+        self.cancelled = False
+
+    def resolve(self, name):
+        """Resolve a path from tool output against the project root or its ancestors."""
+        if os.path.isabs(name):
+            return os.path.normpath(name)
+        current = self.project_root
+        while True:
+            candidate = os.path.normpath(os.path.join(current, name))
+            if os.path.exists(candidate):
+                return candidate
+            parent = os.path.dirname(current)
+            if parent == current:
+                return os.path.normpath(os.path.join(self.project_root, name))
+            current = parent
+
+    def run(self, argv, parse, requests, env=None):
+        """Stream a tool's diagnostics into per-file budgets and return {path: report}.
+
+        A tool that fails without printing any diagnostic has the tail of its
+        output reported against every requested file.
+        """
+        budgets = {path: DiagnosticBudget(path, dependents) for path, dependents in requests.items()}
+        with self.lock:
+            self.cancelled = False
+        returncode, seen, tail = stream_diagnostics(
+            argv, self.project_root, parse, budgets.values(), env, self._started
+        )
+        with self.lock:
+            self.stop = None
+            if self.cancelled:
+                raise CheckCancelled()
+        if returncode and not seen:
+            for budget in budgets.values():
+                budget.fail("\n".join(tail))
+        return {path: budget.report() for path, budget in budgets.items()}
+
+    def _started(self, stop):
+        with self.lock:
+            self.stop = stop
+
+    def cancel(self):
+        """Kill the run in flight, if any."""
+        with self.lock:
+            if self.stop is not None:
+                self.cancelled = True
+                self.stop()
+
+    def alive(self):
+        return True
+
+    def close(self):
+        pass
+
+
+class CargoCheck(CommandChecker):
+    """`cargo check` in its own incremental target dir, so it never waits on the user's build lock."""
+
+    def parse(self, line):
+        if not line.startswith("{"):
+            return None
+        message = json.loads(line)
+        if message.get("reason") != "compiler-message":
+            return None
+        compiler_message = message["message"]
+        if compiler_message.get("level") != "error":
+            return None
+        for span in compiler_message.get("spans", []):
+            if span.get("is_primary"):
+                return {
+                    "file": self.resolve(span["file_name"]),
+                    "line": span["line_start"],
+                    "column": span["column_start"],
+                    "severity": "error",
+                    "code": (compiler_message.get("code") or {}).get("code") or "",
+                    "message": ": ".join(filter(None, (compiler_message["message"], span.get("label")))),
+                }
+        return None
+
+    def check(self, requests):
+        env = dict(
+            os.environ,
+            CARGO_TARGET_DIR=os.path.join(self.project_root, CARGO_TARGET_DIR),
+            CARGO_INCREMENTAL="1",
+        )
+        argv = ["cargo", "check", "--all-targets", "--message-format=json", "--quiet"]
+        return self.run(argv, self.parse, requests, env)
+
+
+class GoVet(CommandChecker):
+    """`go vet` over the edited packages; compiled packages come from Go's build cache."""
+
+    def parse(self, line):
+        if line.startswith("\t"):
+            return line  # Continuation, e.g. have/want lines
+        match = GO_DIAGNOSTIC.match(line)
+        if not match:
+            return None
+        return {
+            "file": self.resolve(match.group(1)),
+            "line": int(match.group(2)),
+            "column": int(match.group(3) or 1),
+            "severity": "error",
+            "code": "",
+            "message": match.group(4),
+        }
+
+    def check(self, requests):
+        files = {*requests, *(d for deps in requests.values() for d in deps)}
+        packages = sorted({"./" + os.path.relpath(os.path.dirname(path), self.project_root) for path in files})
+        return self.run(["go", "vet", *packages], self.parse, requests)
+
+
+class CheckScheduler:
+    """Coalesces check requests into batched checker runs.
+
+    Files requested within CHECK_DEBOUNCE of each other are checked in one
+    run and each waiting caller gets its own file's diagnostics. A
+    request for a file that is already being checked supersedes that run:
+    the run is cancelled and all its callers move to the next batch, so
+    nobody gets pre-edit results or waits for a check nobody needs.
+    """
+
+    def __init__(self, backend):
+        import threading
+
+        self.backend = backend
+        self.condition = threading.Condition()
+        self.pending = {}  # Path -> waiters for the next batch
+        self.running = {}  # Path -> waiters for the batch in flight
+        self.dependents = {}  # Path -> dependents from its latest request
+        self.last_arrival = 0.0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def check(self, file_path, dependents):
+        import threading
+        import time
+
+        waiter = {"done": threading.Event(), "result": None}
+        with self.condition:
+            self.dependents[file_path] = dependents
+            superseded = file_path in self.running
+            if superseded:
+                self.pending.setdefault(file_path, []).extend(self.running.pop(file_path))
+            self.pending.setdefault(file_path, []).append(waiter)
+            self.last_arrival = time.monotonic()
+            self.condition.notify()
+        if superseded:
+            self.backend.cancel()
+
+        if not waiter["done"].wait(CHECK_TIMEOUT):
+            raise RuntimeError("type check timed out")
+        if isinstance(waiter["result"], Exception):
+            raise waiter["result"]
+        return waiter["result"]
+
+    def _run(self):
+        import time
+
+        while True:
+            with self.condition:
+                while not self.pending:
+                    self.condition.wait()
+                started = time.monotonic()
+                while True:
+                    deadline = min(self.last_arrival + CHECK_DEBOUNCE, started + CHECK_MAX_DELAY)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                self.running, self.pending = self.pending, {}
+                requests = {path: self.dependents[path] for path in self.running}
+
+            try:
+                with checker_slot():
+                    results = self.backend.check(requests)
+            except CheckCancelled:
+                results = None
+            except Exception as e:
+                results = e
+
+            with self.condition:
+                if results is None:
+                    # Superseded: everyone still waiting is answered by the next batch
+                    for path, waiters in self.running.items():
+                        self.pending.setdefault(path, []).extend(waiters)
+                    self.running = {}
+                    continue
+                for path, waiters in self.running.items():
+                    for waiter in waiters:
+                        waiter["result"] = results if isinstance(results, Exception) else results[path]
+                        waiter["done"].set()
+                self.running = {}
+
+
+def serve(checker, project_root):
+    """Run the per-project daemon that keeps one checker warm.
+
+    Each connection carries one JSON request ({"file": path}) and gets back
+    {"diagnostics": [...], "note": ..., "failed": ...} or {"error": message}.
+    The daemon finds the file's dependents itself and, for cached checkers,
+    looks the report up and stores it, keeping file digests and imports in a
+    ProjectIndex between requests. It exits after DAEMON_IDLE_TIMEOUT seconds
+    without requests, or if the checker dies.
+    """
+    import fcntl
+    import socketserver
+    import threading
+    import time
+
+    spec = CHECKERS[checker]
+    if spec["find_server"](project_root) is None:
+        return
+
+    socket_path, lock_path = daemon_paths(checker, project_root)
+    os.makedirs(DAEMON_DIR, exist_ok=True)
+    lock_file = open(lock_path, "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return  # Another daemon already serves this project
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+    backend = spec["server"](project_root)
+    scheduler = CheckScheduler(backend)
+    index = ProjectIndex(project_root, spec["sources"], spec["scan"])
+    last_request = [time.monotonic()]
+
+    def check(file_path):
+        def run(dependents):
+            return scheduler.check(file_path, dependents)
+
+        if spec["cache"]:
+            return cached_check(project_root, file_path, "warm", run, index)
+        return run(spec["dependents"](project_root, file_path, index.sources()))
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            last_request[0] = time.monotonic()
+            try:
+                request = json.loads(self.rfile.readline())
+                reply = check(request["file"])
+            except Exception as e:
+                reply = {"error": str(e)}
+            self.wfile.write(json.dumps(reply).encode())
+            last_request[0] = time.monotonic()
+
+    class Server(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+    def watchdog(server):
+        while True:
+            time.sleep(DAEMON_WATCH_INTERVAL)
+            idle = time.monotonic() - last_request[0] > DAEMON_IDLE_TIMEOUT
+            if idle or not backend.alive():
+                server.shutdown()
+                return
+
+    os.umask(0o077)
+    with Server(socket_path, Handler) as server:
+        threading.Thread(target=watchdog, args=(server,), daemon=True).start()
+        try:
+            server.serve_forever()
+        finally:
+            backend.close()
+            try:
+                os.remove(socket_path)
+            except OSError:
+                pass
+
+
+def connect_cache():
+    """Open the diagnostics cache (SQLite in WAL mode, shared by hooks and daemons)."""
+    import sqlite3
+
+    os.makedirs(DAEMON_DIR, exist_ok=True)
+    conn = sqlite3.connect(CACHE_DB, timeout=CACHE_BUSY_TIMEOUT, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS reports ("
+        " key BLOB PRIMARY KEY,"
+        " report TEXT NOT NULL,"
+        " size INTEGER NOT NULL,"
+        " last_used REAL NOT NULL"
+        ") WITHOUT ROWID"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS reports_last_used ON reports (last_used)")
+    # Digest and imports of each dependency, reused while its stat is unchanged
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS files ("
+        " path TEXT PRIMARY KEY,"
+        " mtime_ns INTEGER NOT NULL,"
+        " size INTEGER NOT NULL,"
+        " digest BLOB NOT NULL,"
+        " imports TEXT NOT NULL,"
+        " last_used REAL NOT NULL"
+        ") WITHOUT ROWID"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS files_last_used ON files (last_used)")
+    return conn
+
+
+@contextlib.contextmanager
+def transaction(conn):
+    """Run a block as one write transaction on the cache."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def read_jsonc(path):
+    """Parse a tsconfig-style JSON file with comments and trailing commas."""
+    with open(path, encoding="utf-8") as f:
+        text = JSONC_NOISE.sub(lambda m: m.group(1) or "", f.read())
+    return json.loads(re.sub(r",(\s*[}\]])", r"\1", text))
+
+
+def load_tsconfig(path, seen=()):
+    """Return (files read, compilerOptions) for a tsconfig and its relative extends chain.
+
+    Path options are made absolute against the config that declares them.
+    """
+    config = read_jsonc(path)
+    directory = os.path.dirname(path)
+    files, options = [path], {}
+    parent = config.get("extends")
+    if isinstance(parent, str) and parent.startswith(".") and path not in seen:
+        parent = os.path.normpath(os.path.join(directory, parent))
+        if not parent.endswith(".json"):
+            parent += ".json"
+        files, options = load_tsconfig(parent, seen + (path,))
+        files.append(path)
+    own = dict(config.get("compilerOptions") or {})
+    if "baseUrl" in own:
+        own["baseUrl"] = os.path.join(directory, own["baseUrl"])
+    if "paths" in own:
+        own["pathsBase"] = own.get("baseUrl", directory)
+    options.update(own)
+    return files, options
+
+
+def resolve_import(specifier, directory, options):
+    """Resolve an import to a project file, or None for packages and missing files."""
+    if specifier.startswith("."):
+        bases = [os.path.join(directory, specifier)]
+    else:
+        bases = []
+        for pattern, targets in (options.get("paths") or {}).items():
+            prefix, star, suffix = pattern.partition("*")
+            if star and specifier.startswith(prefix) and specifier.endswith(suffix):
+                matched = specifier[len(prefix):len(specifier) - len(suffix)]
+                bases += [os.path.join(options["pathsBase"], t.replace("*", matched)) for t in targets]
+            elif not star and specifier == pattern:
+                bases += [os.path.join(options["pathsBase"], t) for t in targets]
+        if "baseUrl" in options:
+            bases.append(os.path.join(options["baseUrl"], specifier))
+
+    for base in bases:
+        base = os.path.normpath(base)
+        stem, extension = os.path.splitext(base)
+        candidates = [base]
+        if extension in (".js", ".jsx", ".mjs", ".cjs"):
+            candidates += [stem + e for e in (".ts", ".tsx", ".d.ts", ".mts", ".cts")]
+        candidates += [base + e for e in SOURCE_EXTENSIONS]
+        candidates += [os.path.join(base, "index" + e) for e in SOURCE_EXTENSIONS]
+        for candidate in candidates:
+            if os.path.isfile(candidate):
+                return candidate
+    return None
+
+
+def resolve_imports(path, imports, options):
+    """Resolve a file's import specifiers to the project files they name."""
+    directory = os.path.dirname(path)
+    resolved = (resolve_import(specifier, directory, options) for specifier in imports)
+    return [target for target in resolved if target is not None]
+
+
+def file_digest(conn, path, now, reuse=True):
+    """Return (digest, import specifiers) of a file, reusing the stored entry if unchanged."""
+    stat = os.stat(path)
+    row = reuse and conn.execute(
+        "SELECT digest, imports FROM files WHERE path = ? AND mtime_ns = ? AND size = ?",
+        (path, stat.st_mtime_ns, stat.st_size),
+    ).fetchone()
+    if row:
+        conn.execute("UPDATE files SET last_used = ? WHERE path = ?", (now, path))
+        return row[0], json.loads(row[1])
+
+    with open(path, "rb") as f:
+        content = f.read()
+    digest = hashlib.blake2b(content, digest_size=16).digest()
+    imports = scan_imports(content)
+    conn.execute(
+        "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+        (path, stat.st_mtime_ns, stat.st_size, digest, json.dumps(imports), now),
+    )
+    return digest, imports
+
+
+@contextlib.contextmanager
+def file_digests(conn, index=None):
+    """Yield digest_of(path, reuse=True) -> (digest, imports), from the index or the cache's files table."""
+    from datetime import datetime
+
+    if index is not None:
+        yield index.digest
+        return
+    now = datetime.now().timestamp()
+    with transaction(conn):
+        yield lambda path, reuse=True: file_digest(conn, path, now, reuse)
+
+
+def scan_imports(content):
+    """Return the TypeScript import specifiers in a file's content."""
+    return sorted({m.decode("utf-8", "replace") for m in IMPORT_PATTERN.findall(content)})
+
+
+class ProjectIndex:
+    """Digests, scanned facts (e.g. imports) and resolved imports of a project's files, held by its daemon.
+
+    refresh() stats the tree and re-reads only files whose size or mtime
+    changed, so a check costs a stat walk instead of reading every file.
+    Sources seen by the last refresh are trusted without another stat.
+    """
+
+    def __init__(self, project_root, suffixes, scan):
+        import threading
+
+        self.project_root = project_root
+        self.suffixes = suffixes
+        self.scan = scan
+        self.lock = threading.Lock()
+        self.entries = {}  # Path -> (mtime_ns, size, digest, facts)
+        self.current = set()  # Sources found by the last refresh
+        self.resolved = {}  # Path -> ((mtime_ns, size), resolved imports)
+        self.options = None  # compilerOptions the resolved imports were computed with
+
+    def _entry(self, path, reuse=True):
+        stat = os.stat(path)
+        entry = self.entries.get(path)
+        if not reuse or entry is None or entry[:2] != (stat.st_mtime_ns, stat.st_size):
+            with open(path, "rb") as f:
+                content = f.read()
+            digest = hashlib.blake2b(content, digest_size=16).digest()
+            entry = (stat.st_mtime_ns, stat.st_size, digest, self.scan(content))
+            self.entries[path] = entry
+        return entry
+
+    def refresh(self):
+        """Bring the indexed sources up to date and return their paths."""
+        with self.lock:
+            paths = []
+            # Files read outside the walk (configs, manifests, .js imports) are revalidated on use
+            entries = {path: entry for path, entry in self.entries.items() if not path.endswith(self.suffixes)}
+            for path in walk_files(self.project_root, self.suffixes):
+                try:
+                    entries[path] = self._entry(path)
+                except OSError:
+                    continue
+                paths.append(path)
+            self.entries = entries
+            current = set(paths)
+            if current != self.current:
+                self.resolved = {}  # An added or removed file can change what imports resolve to
+            self.current = current
+            return paths
+
+    def sources(self):
+        """Refresh and return [(path, facts)] for the indexed sources, like read_sources."""
+        paths = self.refresh()
+        with self.lock:
+            return [(path, self.entries[path][3]) for path in paths]
+
+    def digest(self, path, reuse=True):
+        """Return (digest, facts) of any file, re-reading it if it changed or reuse is False."""
+        with self.lock:
+            if reuse and path in self.current:
+                entry = self.entries[path]
+            else:
+                entry = self._entry(path, reuse)
+        return entry[2], entry[3]
+
+    def resolve(self, path, imports, options):
+        """resolve_imports, remembered while the file and the set of sources are unchanged."""
+        with self.lock:
+            if options != self.options:
+                self.options, self.resolved = options, {}
+            stat = self.entries[path][:2] if path in self.entries else None
+            cached = self.resolved.get(path)
+            if cached is not None and cached[0] == stat:
+                return cached[1]
+        resolved = resolve_imports(path, imports, options)
+        if stat is not None:
+            with self.lock:
+                self.resolved[path] = (stat, resolved)
+        return resolved
+
+
+def typescript_options(project_root):
+    """Return the project's merged compilerOptions (empty if there is no readable tsconfig)."""
+    try:
+        return load_tsconfig(os.path.join(project_root, "tsconfig.json"))[1]
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def typescript_dependents(project_root, file_path, sources=None, options=None):
+    """List up to MAX_DEPENDENTS project files that import file_path directly.
+
+    sources yields (path, import specifiers), e.g. from the daemon's index;
+    by default the tree is read.
+    """
+    if options is None:
+        options = typescript_options(project_root)
+    if sources is None:
+        sources = read_sources(project_root, TYPESCRIPT_SOURCES, scan_imports)
+    stem = os.path.basename(file_path).split(".")[0]
+    names = {stem, os.path.basename(os.path.dirname(file_path))} if stem == "index" else {stem}
+    dependents = []
+    for path, imports in sources:
+        if path == file_path:
+            continue
+        directory = os.path.dirname(path)
+        for specifier in imports:
+            # Cheap name check first; only plausible specifiers are resolved
+            if specifier.rstrip("/").rsplit("/", 1)[-1].split(".")[0] not in names:
+                continue
+            if resolve_import(specifier, directory, options) == file_path:
+                dependents.append(path)
+                break
+        if len(dependents) >= MAX_DEPENDENTS:
+            break
+    return dependents
+
+
+def python_module_names(project_root, path):
+    """Return the dotted module names a file is importable as (flat and src/ layouts)."""
+    names = set()
+    for base in (project_root, os.path.join(project_root, "src")):
+        relative = os.path.relpath(os.path.splitext(path)[0], base)
+        if relative.startswith(".."):
+            continue
+        parts = relative.split(os.sep)
+        if parts[-1] == "__init__":
+            parts = parts[:-1]
+        if parts:
+            names.add(".".join(parts))
+    return names
+
+
+def scan_python_imports(content):
+    """Return the (from source, names, modules) import statements in a Python file's content."""
+    return PYTHON_IMPORT.findall(content)
+
+
+def python_dependents(project_root, file_path, sources=None):
+    """List up to MAX_DEPENDENTS project files that import file_path's module directly.
+
+    sources yields (path, import statements), e.g. from the daemon's index;
+    by default the tree is read.
+    """
+    targets = python_module_names(project_root, file_path)
+    if not targets:
+        return []
+    if sources is None:
+        sources = read_sources(project_root, (".py",), scan_python_imports)
+    needles = {name.rsplit(".", 1)[-1].encode() for name in targets}
+    dependents = []
+    for path, statements in sources:
+        if path == file_path:
+            continue
+        # Cheap name check first; only plausible files have their imports resolved
+        if not any(needle in part for statement in statements for part in statement for needle in needles):
+            continue
+        is_package = os.path.basename(path) == "__init__.py"
+        importers = python_module_names(project_root, path)
+        for source, names, modules in statements:
+            if modules:
+                imported = {m.split()[0] for m in modules.decode().split(",") if m.strip()}
+            else:
+                source = source.decode()
+                dots = len(source) - len(source.lstrip("."))
+                bases = {source}
+                if dots:
+                    bases = set()
+                    for importer in importers:
+                        parts = importer.split(".") if is_package else importer.split(".")[:-1]
+                        parts = parts[:len(parts) - dots + 1]
+                        bases.add(".".join(filter(None, [*parts, source[dots:]])))
+                items = [n.split()[0] for n in names.decode().split(",") if n.strip()]
+                imported = bases | {f"{base}.{item}" for base in bases for item in items}
+            if imported & targets:
+                dependents.append(path)
+                break
+        if len(dependents) >= MAX_DEPENDENTS:
+            break
+    return dependents
+
+
+def scan_rust_modules(content):
+    """Return the module names a Rust file declares (`mod name`) or paths through (`name::`)."""
+    return {declared or referenced for declared, referenced in RUST_MODULE_REFERENCE.findall(content)}
+
+
+def rust_dependents(project_root, file_path, sources=None):
+    """List up to MAX_DEPENDENTS crate files that declare or path-reference file_path's module.
+
+    sources yields (path, module names), e.g. from the daemon's index; by
+    default the tree is read.
+    """
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    if stem in ("main", "lib"):
+        return []  # Crate roots have no importers
+    if stem == "mod":
+        stem = os.path.basename(os.path.dirname(file_path))
+    if sources is None:
+        sources = read_sources(project_root, (".rs",), scan_rust_modules)
+    name = stem.encode()
+    dependents = []
+    for path, modules in sources:
+        if path != file_path and name in modules:
+            dependents.append(path)
+            if len(dependents) >= MAX_DEPENDENTS:
+                break
+    return dependents
+
+
+def scan_go_strings(content):
+    """Return the string literals in a Go file, which include its import paths."""
+    return set(GO_STRING.findall(content))
+
+
+def go_dependents(project_root, file_path, sources=None):
+    """List the other files of file_path's package and the files importing that package.
+
+    At most MAX_DEPENDENTS are listed. sources yields (path, string
+    literals), e.g. from the daemon's index; by default the tree is read.
+    """
+    directory = os.path.dirname(file_path)
+    dependents = [
+        entry.path
+        for entry in os.scandir(directory)
+        if entry.name.endswith(".go") and entry.path != file_path
+    ][:MAX_DEPENDENTS]
+    try:
+        with open(os.path.join(project_root, "go.mod"), "rb") as f:
+            module = GO_MODULE.search(f.read())
+    except OSError:
+        module = None
+    if module is None:
+        return dependents
+    relative = os.path.relpath(directory, project_root)
+    import_path = module.group(1).decode()
+    if relative != ".":
+        import_path += "/" + relative.replace(os.sep, "/")
+    if sources is None:
+        sources = read_sources(project_root, (".go",), scan_go_strings)
+    needle = import_path.encode()
+    for path, strings in sources:
+        if len(dependents) >= MAX_DEPENDENTS:
+            break
+        if os.path.dirname(path) != directory and needle in strings:
+            dependents.append(path)
+    return dependents
+
+
+def ambient_declarations(project_root, paths=None):
+    """List the project's .d.ts files, which can declare globals without being imported."""
+    if paths is not None:
+        return [path for path in paths if path.endswith(".d.ts")]
+    return list(walk_files(project_root, (".d.ts",)))
+
+
+def diagnostics_key(file_path, project_root, mode, digest_of, paths=None, resolve=resolve_imports):
+    """Hash everything a check of file_path depends on.
+
+    digest_of(path, reuse) returns a file's (digest, import specifiers);
+    paths, if given, lists the project's TypeScript sources, and resolve
+    stands in for resolve_imports. Returns (key, dependents, inputs), where
+    inputs maps every file hashed to its digest, or (None, None, None) if the
+    inputs can't be pinned down. The key covers the checker mode and
+    diagnostics cap, the file and its direct dependents with their transitive
+    project imports, the tsconfig chain, package manifests and lockfiles
+    (which pin the types of external imports) and ambient .d.ts files.
+    """
+    tsconfig = os.path.join(project_root, "tsconfig.json")
+    try:
+        config_files, options = load_tsconfig(tsconfig) if os.path.isfile(tsconfig) else ([], {})
+    except (OSError, ValueError, AttributeError):
+        return None, None, None  # Unreadable config: aliases can't be resolved, so don't cache
+
+    if paths is None:
+        paths = list(walk_files(project_root, TYPESCRIPT_SOURCES))
+    inputs = {}
+    package_files = [os.path.join(project_root, name) for name in PACKAGE_FILES]
+    for path in config_files + package_files + ambient_declarations(project_root, paths):
+        if os.path.isfile(path):
+            inputs[path] = digest_of(path)[0]
+
+    sources = ((path, digest_of(path)[1]) for path in paths)
+    dependents = typescript_dependents(project_root, file_path, sources, options)
+
+    # The edited file is always re-read: an edit can keep its size and mtime tick
+    pending, visited = [file_path, *dependents], {file_path, *dependents}
+    while pending:
+        path = pending.pop()
+        digest, imports = digest_of(path, path != file_path)
+        inputs[path] = digest
+        for resolved in resolve(path, imports, options):
+            if resolved not in visited:
+                visited.add(resolved)
+                pending.append(resolved)
+
+    key = hashlib.blake2b(digest_size=16)
+    key.update(f"{CACHE_VERSION}\0{mode}\0{MAX_DIAGNOSTICS}\0{file_path}\0".encode())
+    for path in sorted(inputs):
+        key.update(path.encode() + b"\0" + inputs[path])
+    return key.digest(), dependents, inputs
+
+
+def inputs_unchanged(file_path, inputs, digest_of):
+    """True if every file a key was computed from still has the same digest."""
+    try:
+        return all(digest_of(path, path != file_path)[0] == digest for path, digest in inputs.items())
+    except OSError:
+        return False
+
+
+def lookup_report(conn, key):
+    """Return the cached report for a key, or None on a miss."""
+    from datetime import datetime
+
+    row = conn.execute("SELECT report FROM reports WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        return None
+    conn.execute("UPDATE reports SET last_used = ? WHERE key = ?", (datetime.now().timestamp(), key))
+    return json.loads(row[0])
+
+
+def store_report(conn, key, report):
+    """Cache a report under a key, evicting least recently used entries past the budgets."""
+    from datetime import datetime
+
+    data = json.dumps(report)
+    with transaction(conn):
+        conn.execute(
+            "INSERT OR REPLACE INTO reports VALUES (?, ?, ?, ?)",
+            (key, data, len(data), datetime.now().timestamp()),
+        )
+        conn.execute(
+            "DELETE FROM reports WHERE key IN (SELECT key FROM (SELECT key,"
+            " SUM(size) OVER (ORDER BY last_used DESC) AS total FROM reports) WHERE total > ?)",
+            (CACHE_MAX_BYTES,),
+        )
+        conn.execute(
+            "DELETE FROM files WHERE path IN (SELECT path FROM files "
+            "ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (CACHE_MAX_FILES,),
+        )
+
+
+def cached_check(project_root, file_path, mode, check, index=None):
+    """Return check(dependents) for a TypeScript file, through the diagnostics cache.
+
+    The key is computed once; a report is stored only if the check did not
+    fail and none of the files behind the key changed while it ran. Digests
+    come from the daemon's index if given, else from the cache's files table.
+    """
+    import sqlite3
+
+    conn = key = dependents = None
+    paths = index.refresh() if index is not None else None
+    try:
+        conn = connect_cache()
+        resolve = index.resolve if index is not None else resolve_imports
+        with file_digests(conn, index) as digest_of:
+            key, dependents, inputs = diagnostics_key(file_path, project_root, mode, digest_of, paths, resolve)
+        if key is not None:
+            report = lookup_report(conn, key)
+            if report is not None:
+                return report
+    except (OSError, ValueError, sqlite3.Error):
+        key = None  # Cache unavailable: just check
+    if dependents is None:
+        sources = [(path, index.digest(path)[1]) for path in paths] if index is not None else None
+        dependents = typescript_dependents(project_root, file_path, sources)
+
+    result = check(dependents)
+    if key is not None and not result.get("failed"):
+        try:
+            if index is not None:
+                index.refresh()
+            with file_digests(conn, index) as digest_of:
+                unchanged = inputs_unchanged(file_path, inputs, digest_of)
+            if unchanged:
+                store_report(conn, key, result)
+        except (OSError, ValueError, sqlite3.Error):
+            pass  # The result stands even if it can't be cached
+    return result
+
+
+def type_roots(project_root):
+    """Return the node_modules/@types directories tsc finds by default from project_root upward."""
+    roots = []
+    current = project_root
+    while True:
+        candidate = os.path.join(current, "node_modules", "@types")
+        if os.path.isdir(candidate):
+            roots.append(candidate)
+        parent = os.path.dirname(current)
+        if parent == current:
+            return roots
+        current = parent
+
+
+def tsc_project(project_root, files):
+    """Write a tsconfig that checks just the given files with the project's options; return its path.
+
+    It extends the project's tsconfig and goes in the temp directory, so
+    nothing is left in the project if the hook is killed mid-check. Default
+    type roots are relative to the config, so the project's are made
+    explicit. The caller removes the file.
+    """
+    import tempfile
+
+    config = {"extends": os.path.join(project_root, "tsconfig.json"), "files": files, "include": []}
+    if "typeRoots" not in typescript_options(project_root):
+        config["compilerOptions"] = {"typeRoots": type_roots(project_root)}
+    fd, path = tempfile.mkstemp(prefix="type-check-", suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        json.dump(config, f)
+    return path
+
+
+def run_tsc(project_root, file_path, dependents):
+    """Cold path: run a one-off tsc over the file and its dependents.
+
+    In a project, the files go to tsc through a generated tsconfig
+    extending the project's, so the command line stays short and the
+    project's options apply; a stray file is passed directly. If tsc (or npx fetching it) fails without printing a diagnostic,
+    the tail of its output is reported instead.
+    """
+    cwd = os.getcwd()
+
+    def parse(line):
+        if line.startswith("  "):
+            return line  # Continuation of a message chain
+        match = TSC_DIAGNOSTIC.match(line)
+        if match:
+            path, line_number, column, code, message = match.groups()
+            return {
+                "file": os.path.normpath(os.path.join(cwd, path)),
+                "line": int(line_number),
+                "column": int(column),
+                "severity": "error",
+                "code": code,
+                "message": message,
+            }
+        match = TSC_GLOBAL_ERROR.match(line)
+        if match:
+            # Config and option errors have no location; they affect the edited file
+            return {"file": file_path, "line": 1, "column": 1, "severity": "error",
+                    "code": match.group(1), "message": match.group(2)}
+        return None
+
+    # Run the TypeScript compiler to check for type errors
+    budget = DiagnosticBudget(file_path, dependents)
+    config = None
+    if os.path.isfile(os.path.join(project_root, "tsconfig.json")):
+        config = tsc_project(project_root, [file_path, *dependents])
+    inputs = ["--project", config] if config else [file_path, *dependents]
+    try:
+        with checker_slot():
+            returncode, seen, tail = stream_diagnostics(
+                ["npx", "tsc", "--noEmit", "--skipLibCheck", *inputs], None, parse, [budget]
+            )
+    finally:
+        if config:
+            os.remove(config)
+    if returncode and not seen:
+        budget.fail("\n".join(tail))
+    return budget.report()
+
+
+def run_pyright(project_root, file_path, dependents):
+    """Cold path: run the pyright CLI over the file and its dependents, if it is installed.
+
+    pyright only prints its JSON report at exit, so this is filtered and
+    bounded but not stopped early.
+    """
+    cli = find_node_tool(project_root, ("basedpyright", "pyright"))
+    if cli is None:
+        return DiagnosticBudget(file_path).report()
+    budget = DiagnosticBudget(file_path, dependents)
+    try:
+        with checker_slot():
+            result = subprocess.run(
+                [cli, "--outputjson", file_path, *dependents],
+                cwd=project_root,
+                capture_output=True,
+                text=True,
+                timeout=CHECK_TIMEOUT,
+            )
+        output = json.loads(result.stdout)
+    except subprocess.TimeoutExpired:
+        budget.fail(f"pyright did not finish within {CHECK_TIMEOUT}s")
+        return budget.report()
+    except ValueError:
+        # Not a JSON report: pyright failed before checking anything
+        tail = (result.stdout + result.stderr).strip().splitlines()
+        budget.fail("\n".join(tail[-TAIL_LINES:]))
+        return budget.report()
+    for d in output.get("generalDiagnostics", []):
+        if d.get("severity") == "error":
+            start = d["range"]["start"]
+            budget.add({
+                "file": d.get("file"),
+                "line": start["line"] + 1,
+                "column": start["character"] + 1,
+                "severity": "error",
+                "code": d.get("rule", ""),
+                "message": d["message"],
+            })
+    return budget.report()
+
+
+def run_in_process(backend):
+    """Cold path for command checkers: run the backend once in this process."""
+
+    def run(project_root, file_path, dependents):
+        with checker_slot():
+            return backend(project_root).check({file_path: dependents})[file_path]
+
+    return run
+
+
+# Checker registry: file extensions -> warm backend, cold fallback, project markers
+# and how to find a file's direct dependents (from the sources, as scanned by scan).
+# "standalone" checkers can still check a file that is outside any project.
+CHECKERS = {
+    "typescript": {
+        "label": "TypeScript",
+        "extensions": (".ts", ".tsx"),
+        "markers": ("tsconfig.json",),
+        "find_server": find_tsserver,
+        "server": TsServer,
+        "cold": run_tsc,
+        "dependents": typescript_dependents,
+        "sources": TYPESCRIPT_SOURCES,
+        "scan": scan_imports,
+        "cache": True,
+        "standalone": True,
+    },
+    "python": {
+        "label": "Python type",
+        "extensions": (".py", ".pyi"),
+        "markers": ("pyrightconfig.json", "pyproject.toml"),
+        "find_server": find_pyright_langserver,
+        "server": PyrightServer,
+        "cold": run_pyright,
+        "dependents": python_dependents,
+        "sources": (".py",),
+        "scan": scan_python_imports,
+        "cache": False,
+        "standalone": True,
+    },
+    "rust": {
+        "label": "Rust",
+        "extensions": (".rs",),
+        "markers": ("Cargo.toml",),
+        "find_server": find_cargo,
+        "server": CargoCheck,
+        "cold": run_in_process(CargoCheck),
+        "dependents": rust_dependents,
+        "sources": (".rs",),
+        "scan": scan_rust_modules,
+        "cache": False,
+        "standalone": False,
+    },
+    "go": {
+        "label": "Go",
+        "extensions": (".go",),
+        "markers": ("go.mod",),
+        "find_server": find_go,
+        "server": GoVet,
+        "cold": run_in_process(GoVet),
+        "dependents": go_dependents,
+        "sources": (".go",),
+        "scan": scan_go_strings,
+        "cache": False,
+        "standalone": False,
+    },
+}
+
+
+def find_checker(file_path):
+    """Return the name of the checker that handles a file, if any."""
+    for name, spec in CHECKERS.items():
+        if file_path.endswith(spec["extensions"]):
+            return name
+    return None
+
+
+def check_file(checker, file_path):
+    """Return the error report lines for a file, from a warm checker or a cold run."""
+    spec = CHECKERS[checker]
+    path = os.path.abspath(file_path)
+    project_root = find_project_root(path, spec["markers"])
+    warm = spec["find_server"](project_root) is not None
+    if checker != "typescript" and not warm:
+        return []  # No checker installed for this language
+
+    result = None
+    if not any(os.path.isfile(os.path.join(project_root, marker)) for marker in spec["markers"]):
+        # A stray file outside any project: walking its directory for
+        # dependents or cache inputs could mean walking all of $HOME or /tmp
+        if not spec["standalone"]:
+            return []
+        result = spec["cold"](project_root, path, [])
+    elif warm:
+        try:
+            result = check_with_daemon(checker, project_root, path)
+        except (OSError, RuntimeError, ValueError, KeyError):
+            pass  # Daemon unavailable: check cold
+    if result is None:
+
+        def cold(dependents):
+            return spec["cold"](project_root, path, dependents)
+
+        if spec["cache"]:
+            result = cached_check(project_root, path, "cold", cold)
+        else:
+            result = cold(spec["dependents"](project_root, path))
+
+    # Show dependents the way the edited file was given (relative or absolute)
+    display = {path: file_path}
+    report = [
+        format_diagnostic(
+            display.get(d["file"]) or (d["file"] if os.path.isabs(file_path) else os.path.relpath(d["file"])), d
+        )
+        for d in result["diagnostics"]
+    ]
+    if result["note"]:
+        report.append(result["note"])
+    return report
+
+
+def main():
+    try:
+        # Load the JSON data sent from Claude Code via stdin
+        input_data = json.loads(sys.stdin.read())
+    except json.JSONDecodeError as e:
+        print(f"Error decoding JSON: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    # Extract the tool input and the specific file path that was modified
+    tool_input = input_data.get("tool_input", {})
+    file_path = tool_input.get("file_path")
+
+    # Proceed only if a registered checker handles this kind of file
+    checker = file_path and find_checker(file_path)
+    if not checker:
+        return
+
+    report = check_file(checker, file_path)
+    if report:
+        print(f"{CHECKERS[checker]['label']} errors detected - please review:", file=sys.stderr)
+        for output in report:
+            print(output, file=sys.stderr)
 
-try:
-    # Load the JSON data sent from Claude Code via stdin
-    input_data = json.loads(sys.stdin.read())
-except json.JSONDecodeError as e:
-    print(f"Error decoding JSON: {e}", file=sys.stderr)
-    sys.exit(1)
-
-# Extract the tool input and the specific file path that was modified
-tool_input = input_data.get("tool_input", {})
-file_path = tool_input.get("file_path")
-
-# Proceed only if the file path is a TypeScript or TSX file
-if file_path and re.search(r"\.(ts|tsx)$", file_path):
-    try:
-        # Run the TypeScript compiler to check for type errors
-        subprocess.run(
-            [
-                "npx",
-                "tsc",
-                "--noEmit",
-                "--skipLibCheck",
-                file_path,
-            ],
-            check=True,          # Raise an exception if the command fails
-            capture_output=True, # Capture stdout and stderr
-            text=True            # Decode output as text
-        )
-    except subprocess.CalledProcessError as e:
-        # If tsc finds errors, it exits with a non-zero status code, raising this exception.
-        # Print a warning message to stderr.
-        print(f"TypeScript errors detected - please review:", file=sys.stderr)
-        
-        # Print the detailed errors from tsc to stderr.
-        if e.stdout:
-            print(e.stdout, file=sys.stderr)
-        if e.stderr:
-            print(e.stderr, file=sys.stderr)
-            
         # Exit with code 2, which signals a "blocking error" to Claude Code.
         # This prompts Claude to process the error feedback.
-        sys.exit(2)
\ No newline at end of file
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["serve"]:
+        serve(sys.argv[2], os.path.abspath(sys.argv[3]))
+    else:
+        main()
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.10"
+# dependencies = [
+#     "google-genai>=1.0.0",
+#     "pillow>=10.0.0",
+# ]
+# ///
+"""
+Benchmark for generate.py
+
+Runs against a simulated API client, so no key or network is needed.
+
+Usage:
+    uv run benchmark_generate.py encode [--batch N] [--latency S] [--mode RGB|RGBA]
+    uv run benchmark_generate.py optimize [--inputs N]
+    uv run benchmark_generate.py throughput [--batches 1,4,16,64,256] [--concurrency 4,16]
+                                            [--latency S] [--errors P] [--size PX]
+
+Benchmarks:
+    encode   End-to-end batch latency at 1K/2K/4K: the original on-event-loop
+             decode/convert/encode vs. the current path (write-through for
+             RGB PNG responses, worker threads otherwise), with the worst
+             event-loop stall seen by other requests; then 4K save time and
+             file size for write-through, each PNG compression level and
+             lossless WebP
+    optimize Loading N 24 MP camera JPEGs: the original full decode + LANCZOS
+             vs. draft-mode decode + reducing_gap, alone and end to end with
+             PNG encoding (original sequential vs. parallel load_input_images,
+             cold cache); wall time and peak RSS per path, each in a fresh
+             process, plus PSNR against the original resize
+  throughput Scheduler throughput against the fake backend for each batch
+             size and concurrency, each in a fresh process: wall time,
+             images/s against the ideal of concurrency / latency, retries,
+             mean save time per image and its share of the wall time, and
+             peak RSS growth per request in flight
+"""
+
+import argparse
+import asyncio
+import math
+import multiprocessing
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from io import BytesIO
+from pathlib import Path
+
+# Add scripts directory to path for sibling import
+sys.path.insert(0, str(Path(__file__).parent))
+import generate as gen
+
+SIZES = [("1K", 1024), ("2K", 2048), ("4K", 4096)]
+CAMERA_SIZE = (6000, 4000)  # 24 MP
+
+
+def make_image_bytes(dim, mode):
+    """Encode a photo-like dim x dim PNG (gradients plus soft grain) in the given mode."""
+    from PIL import Image, ImageFilter
+
+    base = Image.radial_gradient("L").resize((dim, dim))
+    grain = Image.effect_noise((dim, dim), 24).filter(ImageFilter.GaussianBlur(2))
+    image = Image.merge("RGB", (base, Image.blend(base, grain, 0.3), Image.blend(base.rotate(90), grain, 0.15)))
+    if mode == "RGBA":
+        image.putalpha(base)
+    out = BytesIO()
+    image.save(out, "PNG")
+    return out.getvalue()
+
+
+def make_camera_jpeg(path, seed):
+    """Write a photo-like 24 MP JPEG (smooth gradients plus sensor-like grain)."""
+    from PIL import Image, ImageFilter
+
+    random.seed(seed)
+    width, height = CAMERA_SIZE
+    base = Image.radial_gradient("L").resize(CAMERA_SIZE).rotate(random.randrange(360))
+    grain = Image.effect_noise(CAMERA_SIZE, 30).filter(ImageFilter.GaussianBlur(1))
+    image = Image.merge("RGB", (base, Image.blend(base, grain, 0.25), Image.blend(base.transpose(0), grain, 0.1)))
+    image.save(path, "JPEG", quality=92)
+
+
+def legacy_optimize(path):
+    """The original input path, kept here as the baseline: full decode, then LANCZOS."""
+    from PIL import Image
+
+    img = Image.open(path)
+    img.load()
+    width, height = img.size
+    scale = gen.MAX_DIMENSION / max(width, height)
+    return img.resize((round(width * scale), round(height * scale)), Image.Resampling.LANCZOS)
+
+
+def draft_optimize(path):
+    from PIL import Image
+
+    img = gen.optimize_image(Image.open(path))
+    img.load()
+    return img
+
+
+def legacy_load_all(paths):
+    """Original end to end: sequential decode + resize + PNG encode per input."""
+    for path in paths:
+        legacy_optimize(path).save(BytesIO(), "PNG")
+
+
+def current_load_all(paths):
+    gen.load_input_images(paths, verbose=False)
+
+
+def measure_in_child(func_name, paths, cache_dir, results):
+    """Run one loading path in this (fresh) process; report wall time and peak RSS."""
+    gen.REFERENCE_CACHE_DIR = Path(cache_dir)
+    func = globals()[func_name]
+    started = time.perf_counter()
+    if func_name.endswith("_all"):
+        func(paths)
+    else:
+        for path in paths:
+            func(path)
+    elapsed = time.perf_counter() - started
+    results.put((elapsed, peak_rss_mb()))
+
+
+def peak_rss_mb():
+    """This process's peak RSS. ru_maxrss survives fork/exec on Linux, so prefer VmHWM."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def psnr(a, b):
+    """Peak signal-to-noise ratio between two same-size RGB images, in dB."""
+    from PIL import ImageChops, ImageStat
+
+    mse = sum(value ** 2 for value in ImageStat.Stat(ImageChops.difference(a, b)).rms) / 3
+    return float("inf") if mse == 0 else 20 * math.log10(255 / math.sqrt(mse))
+
+
+async def legacy_generate(client, output_path):
+    """The original flow, kept here as the baseline: decode and encode on the event loop."""
+    from PIL import Image
+
+    response = await client.aio.models.generate_content(model=gen.MODEL, contents=["x"], config=None)
+    image_bytes, _ = gen.extract_image_and_text(response)
+    image = Image.open(BytesIO(image_bytes))
+    if image.mode == 'RGBA':
+        rgb_image = Image.new('RGB', image.size, (255, 255, 255))
+        rgb_image.paste(image, mask=image.split()[3])
+        rgb_image.save(str(output_path), 'PNG')
+    elif image.mode == 'RGB':
+        image.save(str(output_path), 'PNG')
+    else:
+        image.convert('RGB').save(str(output_path), 'PNG')
+
+
+async def watch_loop(stalls, interval=0.005):
+    """Record the worst lateness of a periodic wake-up: how long the loop was blocked."""
+    while True:
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        stalls.append(time.perf_counter() - expected)
+
+
+async def run_batch(make_request, batch):
+    """Run `batch` requests concurrently; return (wall seconds, worst loop stall)."""
+    stalls = [0.0]
+    watcher = asyncio.create_task(watch_loop(stalls))
+    started = time.perf_counter()
+    await asyncio.gather(*(make_request(i) for i in range(batch)))
+    wall = time.perf_counter() - started
+    watcher.cancel()
+    return wall, max(stalls)
+
+
+def bench_encode(args):
+    from PIL import Image
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        out_dir = Path(tmp)
+        print(f"Batch of {args.batch}, {args.latency:.1f}s simulated API latency, {args.mode} PNG responses\n")
+        print(f"{'size':<5} {'path':<10} {'batch latency':>14} {'max loop stall':>15}")
+        encoded = {}
+        for label, dim in SIZES:
+            encoded[label] = make_image_bytes(dim, args.mode)
+            client = gen.FakeBackend(args.latency, payload=encoded[label])
+
+            def legacy(i):
+                return legacy_generate(client, out_dir / f"legacy-{i}.png")
+
+            def current(i):
+                return gen.generate_image_async(client, "x", out_dir / f"current-{i}.png", resolution=label)
+
+            # Warm up imports and thread pool outside the measurement
+            asyncio.run(run_batch(current, 1))
+            for name, make_request in (("on-loop", legacy), ("current", current)):
+                wall, stall = asyncio.run(run_batch(make_request, args.batch))
+                print(f"{label:<5} {name:<10} {wall:13.2f}s {stall * 1000:13.0f}ms")
+
+        # RGBA input forces a decode and re-encode, so compression levels apply
+        rgb_bytes = make_image_bytes(4096, "RGB")
+        rgba_bytes = make_image_bytes(4096, "RGBA")
+        print(f"\n4K save, one image:")
+        print(f"{'output':<28} {'time':>8} {'size':>10}")
+        outputs = [("RGB PNG write-through", rgb_bytes, "png", gen.DEFAULT_PNG_COMPRESSION)]
+        outputs += [(f"RGBA -> PNG level {level}", rgba_bytes, "png", level) for level in (1, 3, 6)]
+        outputs.append(("RGBA -> WebP lossless", rgba_bytes, "webp", gen.DEFAULT_PNG_COMPRESSION))
+        for name, image_bytes, suffix, level in outputs:
+            path = out_dir / f"save.{suffix}"
+            started = time.perf_counter()
+            gen.save_image(image_bytes, path, level)
+            elapsed = time.perf_counter() - started
+            Image.open(path).verify()
+            print(f"{name:<28} {elapsed * 1000:6.0f}ms {path.stat().st_size / 1e6:8.1f}MB")
+
+
+def bench_optimize(args):
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [str(Path(tmp) / f"camera-{i}.jpg") for i in range(args.inputs)]
+        for i, path in enumerate(paths):
+            make_camera_jpeg(path, i)
+
+        print(f"{args.inputs} inputs at {CAMERA_SIZE[0]}x{CAMERA_SIZE[1]} (24 MP) -> {gen.MAX_DIMENSION}px\n")
+        print(f"{'path':<46} {'time':>8} {'peak RSS':>10}")
+        variants = [
+            ("legacy_optimize", "original: full decode + LANCZOS"),
+            ("draft_optimize", "draft decode + reducing_gap"),
+            ("legacy_load_all", "original end to end (sequential, + PNG)"),
+            ("current_load_all", "load_input_images (parallel, + PNG)"),
+        ]
+        for func_name, label in variants:
+            results = context.Queue()
+            child = context.Process(
+                target=measure_in_child, args=(func_name, paths, Path(tmp) / f"cache-{func_name}", results)
+            )
+            child.start()
+            elapsed, peak = results.get()
+            child.join()
+            print(f"{label:<46} {elapsed:7.2f}s {peak:8.0f}MB")
+
+        print(f"\nPSNR of draft + reducing_gap vs. original resize: {psnr(legacy_optimize(paths[0]), draft_optimize(paths[0])):.1f} dB")
+
+
+def current_rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+
+
+def reset_peak_rss():
+    """Restart VmHWM from the current RSS (Linux 4.0+); returns False where unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def throughput_in_child(batch, concurrency, args, results):
+    """Run one batch through run_batch against the fake backend in this (fresh) process."""
+    client = gen.FakeBackend(args.latency, args.errors, args.size)
+
+    async def run(out_dir, count):
+        scheduler = gen.RequestScheduler(concurrency, rate=0)
+        paths = [out_dir / f"image-{i}.png" for i in range(count)]
+        return [timing async for *_, timing in gen.run_batch(client, paths, "x", None, "1:1", None, False, scheduler)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Warm up imports, the synthetic image and the thread pool outside the measurement
+        asyncio.run(run(Path(tmp), 1))
+        baseline = current_rss_mb()
+        reset_peak_rss()
+        started = time.perf_counter()
+        timings = asyncio.run(run(Path(tmp), batch))
+        wall = time.perf_counter() - started
+    results.put((wall, timings, peak_rss_mb() - baseline))
+
+
+def bench_throughput(args):
+    context = multiprocessing.get_context("spawn")
+    print(f"Fake backend: {args.size}px PNGs, {args.latency:.2f}s latency, {args.errors:.0%} errors; rate limit off\n")
+    print(f"{'batch':>5} {'conc':>5} {'wall':>8} {'img/s':>7} {'ideal':>7} {'retries':>8} {'save/img':>9} {'save %':>7} {'MB/req':>7}")
+    for concurrency in args.concurrency:
+        for batch in args.batches:
+            results = context.Queue()
+            child = context.Process(target=throughput_in_child, args=(batch, concurrency, args, results))
+            child.start()
+            wall, timings, growth = results.get()
+            child.join()
+            in_flight = min(batch, concurrency)
+            ideal = in_flight / args.latency
+            save = statistics.mean(t["decode"] for t in timings)
+            retries = sum(t["retries"] for t in timings)
+            print(
+                f"{batch:>5} {concurrency:>5} {wall:7.2f}s {batch / wall:7.1f} {ideal:7.1f} {retries:>8}"
+                f" {save * 1000:7.1f}ms {save * batch / wall / in_flight:6.1%} {growth / in_flight:7.1f}"
+            )
+
+
+def int_list(value):
+    return [int(item) for item in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark generate.py",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    sub = parser.add_subparsers(dest="benchmark", required=True)
+
+    encode = sub.add_parser("encode", help="Output saving: on the event loop vs. write-through and worker threads")
+    encode.add_argument("--batch", type=int, default=4)
+    encode.add_argument("--latency", type=float, default=1.0, help="Simulated seconds per API call")
+    encode.add_argument("--mode", choices=["RGB", "RGBA"], default="RGB", help="Mode of the returned PNGs")
+    encode.set_defaults(func=bench_encode)
+
+    optimize = sub.add_parser("optimize", help="Input loading: full decode vs. draft decode, on 24 MP JPEGs")
+    optimize.add_argument("--inputs", type=int, default=4)
+    optimize.set_defaults(func=bench_optimize)
+
+    throughput = sub.add_parser("throughput", help="Scheduler throughput and memory per request against the fake backend")
+    throughput.add_argument("--batches", type=int_list, default=[1, 4, 16, 64, 256], help="Comma-separated batch sizes")
+    throughput.add_argument("--concurrency", type=int_list, default=[gen.DEFAULT_CONCURRENCY, 16], help="Comma-separated concurrency limits")
+    throughput.add_argument("--latency", type=float, default=0.5, help="Simulated seconds per API call")
+    throughput.add_argument("--errors", type=float, default=0.0, help="Fraction of calls failing with a retryable error")
+    throughput.add_argument("--size", type=int, default=1024, help="Pixel size of the returned square PNGs")
+    throughput.set_defaults(func=bench_throughput)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
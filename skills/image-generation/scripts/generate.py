@@ -14,6 +14,14 @@ Supports three modes:
   - i2i (image-to-image): Edit a single image with a prompt
   - Multi-reference: Compose from multiple images (up to 14)
 
+Any mode can also run in bulk from a manifest (--manifest): a JSONL or CSV
+file with one job per line/row. JSONL fields: prompt, output (required),
+inputs (list), aspect, resolution, grounding. CSV uses the same columns,
+with inputs separated by ";". Relative paths resolve against the manifest's
+directory. Each finished job is appended to a JSONL report; jobs whose
+output already exists are skipped, so an interrupted run can be resumed by
+running it again.
+
 Usage:
     # Text-to-image
     uv run generate.py --prompt "A cat in space" --output cat.png
@@ -25,33 +33,87 @@ Usage:
     uv run generate.py --prompt "Combine cat from first with background from second" \\
         --input cat.png --input background.png --output composite.png
 
-    # Batch generation (up to 4 images, async parallel)
+    # Batch generation (async parallel, rate limited)
     uv run generate.py --prompt "A cat in space" --output cat.png --batch 4
 
+    # Large batch: 8 requests in flight, at most 30 started per minute
+    uv run generate.py --prompt "A cat in space" --output cat.png --batch 100 \\
+        --concurrency 8 --rate 30
+
+    # Bulk generation from a manifest (report: shots.report.jsonl)
+    uv run generate.py --manifest shots.jsonl --concurrency 8
+
 Options:
-    --prompt, -p     Image description or edit instruction (required)
-    --output, -o     Output file path (required)
+    --prompt, -p     Image description or edit instruction (required without --manifest)
+    --output, -o     Output file path (required without --manifest); a .webp
+                     path saves lossless WebP, anything else PNG
     --input, -i      Input image(s) for editing (repeatable, up to 14)
     --aspect, -a     Aspect ratio (1:1, 16:9, 9:16, etc.)
     --resolution, -r Resolution: 1K, 2K, 4K (default: auto-detect or 1K)
     --grounding, -g  Enable Google Search grounding
-    --batch, -b      Generate multiple variations (1-4, default: 1)
+    --batch, -b      Generate multiple variations (default: 1)
+    --concurrency, -c  Requests in flight at once (default: 4)
+    --rate           Requests started per minute, 0 for no limit (default: 60)
+    --manifest, -m   JSONL/CSV file of jobs to run instead of --prompt
+    --report         JSONL report path for --manifest (default: <manifest>.report.jsonl)
+    --upload-inputs  Upload input images once via the Files API instead of
+                     sending them inline with every request
+    --png-compression  PNG zlib level 0-9; lower is faster but larger (default: 6)
+    --cache, --no-cache  Reuse results of identical earlier requests (default:
+                     off, or on with GENERATE_IMAGE_CACHE=1)
+    --refresh        Regenerate and replace cached results (implies --cache)
+    --backend        gemini, or fake[:latency=S,errors=P,size=PX] to run offline
+                     against synthetic images (default: gemini)
+    --worker         Run in the warm worker (started on first use), which keeps
+                     the SDK loaded and its connections open between calls
+    --serve-worker   Run the warm worker in the foreground
+    --profile-startup  Run under -X importtime and list the slowest imports
+
+Input images are encoded once per run and shared by every request. JPEG,
+PNG and WebP inputs that need no resizing are sent as-is; resized inputs
+are cached (by file hash and resize settings) under
+~/.cache/generate-image/references, so reruns skip the decode and encode.
+
+With --cache, results are also cached under ~/.cache/generate-image/results,
+keyed by the model, prompt, input images, aspect, resolution, grounding and
+variant number, so an identical rerun returns without calling the API.
+
+The fake backend returns synthetic images after a simulated delay, with an
+optional rate of retryable errors, so scheduling, saving and manifests can
+be tried and tuned without spending quota (see benchmark_generate.py).
+
+The Gemini SDK import dominates startup, so it is deferred until the first
+API call; runs served from the result cache never load it. For many short
+calls, --worker (or GENERATE_IMAGE_WORKER=1) hands each call to a resident
+worker process that already has the SDK loaded and its connections open;
+the call's output is relayed as it happens. The first call starts the
+worker and runs in-process. The worker exits after 15 idle minutes, or
+when this script changes.
 
 Environment:
-    GEMINI_API_KEY - Required API key
+    GEMINI_API_KEY - Required API key (not used by the fake backend)
+    GENERATE_IMAGE_BACKEND - Default for --backend
+    GENERATE_IMAGE_WORKER - Set to 1 to use the warm worker by default
 """
 
-import argparse
 import asyncio
+import base64
+import hashlib
+import json
 import os
+import random
 import sys
-from datetime import datetime
-from io import BytesIO
+import time
+from io import BytesIO, TextIOBase
 from pathlib import Path
+from types import SimpleNamespace
+from typing import AsyncIterator, NamedTuple
 
 
 MODEL = "gemini-3-pro-image-preview"
 DEFAULT_OUTPUT_DIR = Path.home() / "Documents" / "generated images"
+MAX_INPUTS = 14
+RESOLUTIONS = ["1K", "2K", "4K"]
 
 
 def get_api_key() -> str | None:
@@ -91,6 +153,9 @@ SUPPORTED_RATIOS = [
 ]
 
 
+ASPECT_RATIOS = [name for name, _ in SUPPORTED_RATIOS]
+
+
 def get_closest_aspect_ratio(width: int, height: int) -> str:
     """Find closest supported aspect ratio for given dimensions."""
     actual_ratio = width / height
@@ -99,10 +164,56 @@ def get_closest_aspect_ratio(width: int, height: int) -> str:
 
 
 MAX_DIMENSION = 2048
+RESIZE_REDUCING_GAP = 3.0  # Box-reduce to within 3x of the target before LANCZOS; indistinguishable in practice
+LOAD_WORKERS = os.cpu_count() or 4  # Input images decoded in parallel
+
+# Encoded reference images
+REFERENCE_CACHE_DIR = Path.home() / ".cache" / "generate-image" / "references"
+REFERENCE_CACHE_MAX_BYTES = 512 * 1024 * 1024  # Least recently used entries are evicted beyond this
+REFERENCE_ENCODING = "png-v2"  # Bump when the encoding changes to invalidate cached entries
+PASSTHROUGH_FORMATS = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+UPLOAD_REUSE_MARGIN = 60 * 60  # Re-upload files that expire within this many seconds
+
+# Generated results (opt-in: --cache or GENERATE_IMAGE_CACHE=1)
+RESULT_CACHE_DIR = Path.home() / ".cache" / "generate-image" / "results"
+RESULT_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024  # Least recently used entries are evicted beyond this
+
+# Output encoding
+DEFAULT_PNG_COMPRESSION = 6  # zlib level 0-9 (Pillow's default); lower is faster, larger files
+WEBP_LOSSLESS_OPTIONS = {"method": 0, "quality": 0}  # Fastest effort: ~PNG level 6 size at level 1 speed
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Request scheduling
+DEFAULT_CONCURRENCY = 4  # Requests in flight at once
+DEFAULT_RATE = 60  # Requests started per minute (token bucket refill rate)
+MAX_ATTEMPTS = 5  # Per image, including the first request
+RETRY_BASE_DELAY = 2.0  # Seconds; the backoff cap doubles per attempt, with full jitter
+RETRY_MAX_DELAY = 60.0
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+# Offline fake backend (--backend fake): exercises the whole pipeline without a key or quota
+FAKE_LATENCY = 2.0  # Seconds per request, jittered by +/-20%
+FAKE_ERROR_STATUS = [429, 503]  # Simulated failures are retryable, like the real ones
+RESOLUTION_PIXELS = {"1K": 1024, "2K": 2048, "4K": 4096}
+
+# Warm worker (--worker): keeps the SDK imported and its connections open between CLI calls
+WORKER_SOCKET = Path.home() / ".cache" / "generate-image" / "worker.sock"
+WORKER_IDLE_TIMEOUT = 15 * 60  # Seconds without calls before the worker exits
+WORKER_WATCH_INTERVAL = 5  # Seconds between idle / script-change checks
+WORKER_CONNECT_TIMEOUT = 2  # Seconds to wait for the worker to accept a call before running in-process
+WORKER_ENV = ["GEMINI_API_KEY", "GOOGLE_GEMINI_BASE_URL", "GENERATE_IMAGE_CACHE", "GENERATE_IMAGE_BACKEND"]
+
+worker_loop = None  # Set in the warm worker: its long-lived event loop, which every call runs on
+warm_clients = {}  # In the warm worker: (API key, base URL) -> LazyClient kept open between calls
 
 
 def optimize_image(img, max_dim=MAX_DIMENSION):
-    """Resize if larger than max_dim, preserving aspect ratio."""
+    """Resize if larger than max_dim, preserving aspect ratio.
+
+    Call before the pixels are loaded: JPEGs are then decoded at a reduced
+    DCT scale (1/2, 1/4 or 1/8) that still covers the target size, and the
+    rest is one resize that box-reduces before the LANCZOS pass.
+    """
     from PIL import Image
     width, height = img.size
     if max(width, height) <= max_dim:
@@ -110,7 +221,189 @@ def optimize_image(img, max_dim=MAX_DIMENSION):
 
     scale = max_dim / max(width, height)
     new_size = (round(width * scale), round(height * scale))
-    return img.resize(new_size, Image.Resampling.LANCZOS)
+    if img.format == "JPEG":
+        img.draft(img.mode, new_size)
+    return img.resize(new_size, Image.Resampling.LANCZOS, reducing_gap=RESIZE_REDUCING_GAP)
+
+
+class ReferenceImage(NamedTuple):
+    """An input image encoded once; `part` is shared read-only by every request."""
+    path: str
+    key: str  # Hash of the source file and encoding settings
+    part: dict  # genai Part as a dict (no SDK import): inline bytes, or an uploaded file's URI
+    size: tuple[int, int]
+    original_size: tuple[int, int]
+
+    @property
+    def width(self) -> int:
+        return self.size[0]
+
+    @property
+    def height(self) -> int:
+        return self.size[1]
+
+
+def evict_lru(directory: Path, max_bytes: int):
+    """Delete the least recently used .bin entries in directory beyond max_bytes."""
+    entries = sorted(
+        (entry.stat().st_mtime, entry.stat().st_size, entry)
+        for entry in directory.iterdir()
+        if entry.suffix == ".bin"
+    )
+    total = sum(size for _, size, _ in entries)
+    for _, size, entry in entries:
+        if total <= max_bytes:
+            break
+        entry.unlink(missing_ok=True)
+        total -= size
+
+
+def prune_reference_cache():
+    """Evict least recently used cache entries beyond REFERENCE_CACHE_MAX_BYTES.
+
+    Upload handles older than the Files API retention (48 hours) go too.
+    """
+    for handle in REFERENCE_CACHE_DIR.glob("*.upload.json"):
+        if time.time() - handle.stat().st_mtime > 48 * 60 * 60:
+            handle.unlink(missing_ok=True)
+    evict_lru(REFERENCE_CACHE_DIR, REFERENCE_CACHE_MAX_BYTES)
+
+
+def load_reference(img_path, max_dim=MAX_DIMENSION) -> ReferenceImage:
+    """Encode an input image for the API once, reusing the on-disk cache when possible."""
+    from PIL import Image
+
+    raw = Path(img_path).read_bytes()
+    key = hashlib.sha256(raw + f"\0{max_dim}\0{REFERENCE_ENCODING}".encode()).hexdigest()
+    # Only the header is read until pixel data is needed
+    img = Image.open(BytesIO(raw))
+    original_size = img.size
+
+    cached = REFERENCE_CACHE_DIR / f"{key}.bin"
+    if max(original_size) <= max_dim and img.format in PASSTHROUGH_FORMATS:
+        data, mime_type, size = raw, PASSTHROUGH_FORMATS[img.format], original_size
+    elif cached.exists():
+        data = cached.read_bytes()
+        os.utime(cached)  # Mark as recently used
+        mime_type, size = "image/png", Image.open(BytesIO(data)).size
+    else:
+        img = optimize_image(img, max_dim)
+        if img.mode not in ("1", "L", "LA", "P", "RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        out = BytesIO()
+        img.save(out, "PNG")
+        data, mime_type, size = out.getvalue(), "image/png", img.size
+        try:
+            REFERENCE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            part_path = cached.with_name(f".{cached.name}.{os.getpid()}.part")
+            part_path.write_bytes(data)
+            os.replace(part_path, cached)
+            prune_reference_cache()
+        except OSError:
+            pass  # The cache is an optimization only
+
+    part = {"inline_data": {"data": data, "mime_type": mime_type}}
+    return ReferenceImage(str(img_path), key, part, size, original_size)
+
+
+def load_input_images(paths: list, verbose: bool = True) -> list[ReferenceImage]:
+    """Load and encode input images in parallel, downscaling any larger than MAX_DIMENSION."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    # Pillow releases the GIL while decoding, resizing and encoding
+    with ThreadPoolExecutor(max_workers=max(1, min(LOAD_WORKERS, len(paths)))) as pool:
+        images = list(pool.map(load_reference, paths))
+    for img_path, img in zip(paths, images):
+        if not verbose:
+            continue
+        if img.size != img.original_size:
+            print(f"Loaded: {img_path} ({img.original_size[0]}x{img.original_size[1]} → {img.size[0]}x{img.size[1]})")
+        else:
+            print(f"Loaded: {img_path} ({img.size[0]}x{img.size[1]})")
+    return images
+
+
+async def upload_references(client, references: list[ReferenceImage], uploaded: dict) -> list[ReferenceImage]:
+    """Upload each distinct reference once and point its part at the file handle.
+
+    `uploaded` maps reference keys to uploaded parts for the rest of the run.
+    Handles are also remembered on disk (per API key) until shortly before
+    the file expires, so reruns skip the upload too.
+    """
+    account = hashlib.sha256((get_api_key() or "").encode()).hexdigest()[:12]
+    result = []
+    for ref in references:
+        if ref.key not in uploaded:
+            handle_path = REFERENCE_CACHE_DIR / f"{ref.key}.{account}.upload.json"
+            try:
+                handle = json.loads(handle_path.read_text())
+                if handle["expires"] - time.time() < UPLOAD_REUSE_MARGIN:
+                    handle = None
+            except (OSError, ValueError, KeyError):
+                handle = None
+
+            if handle is None:
+                blob = ref.part["inline_data"]
+                file = await client.aio.files.upload(
+                    file=BytesIO(blob["data"]),
+                    config={"mime_type": blob["mime_type"], "display_name": Path(ref.path).name},
+                )
+                while file.state and file.state.name == "PROCESSING":
+                    await asyncio.sleep(0.5)
+                    file = await client.aio.files.get(name=file.name)
+                handle = {"uri": file.uri, "mime_type": blob["mime_type"]}
+                if file.expiration_time:  # Files without an expiry are not remembered across runs
+                    handle["expires"] = file.expiration_time.timestamp()
+                    try:
+                        REFERENCE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                        handle_path.write_text(json.dumps(handle))
+                    except OSError:
+                        pass
+
+            uploaded[ref.key] = {"file_data": {"file_uri": handle["uri"], "mime_type": handle["mime_type"]}}
+        result.append(ref._replace(part=uploaded[ref.key]))
+    return result
+
+
+def load_manifest(manifest_path: Path) -> list[dict]:
+    """Read and validate the jobs of a JSONL or CSV manifest."""
+    base = manifest_path.parent
+    if manifest_path.suffix.lower() == ".csv":
+        import csv
+        with manifest_path.open(newline="") as f:
+            rows = list(csv.DictReader(f))
+        for row in rows:
+            row["inputs"] = [p.strip() for p in (row.get("inputs") or "").split(";") if p.strip()]
+            row["grounding"] = (row.get("grounding") or "").strip().lower() in ("1", "true", "yes")
+    else:
+        with manifest_path.open() as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    jobs = []
+    for number, row in enumerate(rows, 1):
+        inputs = row.get("inputs") or []
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        aspect = row.get("aspect") or None
+        resolution = row.get("resolution") or None
+        if not row.get("prompt") or not row.get("output"):
+            raise ValueError(f"job {number}: prompt and output are required")
+        if len(inputs) > MAX_INPUTS:
+            raise ValueError(f"job {number}: maximum {MAX_INPUTS} input images allowed")
+        if aspect not in (None, *ASPECT_RATIOS):
+            raise ValueError(f"job {number}: unsupported aspect ratio {aspect!r}")
+        if resolution not in (None, *RESOLUTIONS):
+            raise ValueError(f"job {number}: unsupported resolution {resolution!r}")
+        jobs.append({
+            "job": number,
+            "prompt": row["prompt"],
+            "inputs": [base / p for p in inputs],
+            "aspect": aspect,
+            "resolution": resolution,
+            "grounding": bool(row.get("grounding")),
+            "output": base / row["output"],
+        })
+    return jobs
 
 
 def save_prompt_log(
@@ -119,7 +412,9 @@ def save_prompt_log(
     output_images: list[Path],
     source_images: list[str] | None = None
 ):
-    """Save the prompt used to generate images as a single .md file."""
+    """Save the prompt used to generate images as a single .md file (replaced atomically)."""
+    from datetime import datetime
+
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
     content = f"# Image Generation Log\n\n"
@@ -141,11 +436,13 @@ def save_prompt_log(
 
     content += f"## Prompt\n\n```\n{prompt}\n```\n"
 
-    log_path.write_text(content)
+    part_path = log_path.with_name(f".{log_path.name}.part")
+    part_path.write_text(content)
+    os.replace(part_path, log_path)
 
 
 def extract_image_and_text(response):
-    """Extract image and text from response parts."""
+    """Extract the encoded image bytes and text from response parts."""
     parts = response.parts if hasattr(response, 'parts') else response.candidates[0].content.parts
 
     text_response = None
@@ -155,18 +452,246 @@ def extract_image_and_text(response):
         if part.text is not None:
             text_response = part.text
         elif part.inline_data is not None:
-            from PIL import Image
-            image_bytes = part.inline_data.data
-            image_response = Image.open(BytesIO(image_bytes))
+            image_response = part.inline_data.data
 
     return image_response, text_response
 
 
-def copy_images(images: list) -> list:
-    """Create deep copies of PIL Images to avoid thread-safety issues."""
-    if not images:
+def is_rgb_png(image_bytes: bytes) -> bool:
+    """True if the bytes are an 8-bit truecolor (RGB) PNG, judging by the IHDR header."""
+    # Signature, IHDR length and type, width, height, then bit depth and color type
+    return (
+        image_bytes[:8] == PNG_SIGNATURE
+        and image_bytes[12:16] == b"IHDR"
+        and image_bytes[24:26] == b"\x08\x02"
+    )
+
+
+def save_image(image_bytes: bytes, output_path: Path, png_compression: int = DEFAULT_PNG_COMPRESSION):
+    """Save model output as RGB PNG, or lossless WebP for .webp paths.
+
+    An RGB PNG bound for a PNG path is written as received, with no decode
+    or re-encode (png_compression then doesn't apply). Otherwise the image
+    is decoded, converted and encoded; this runs in a worker thread, as
+    Pillow releases the GIL in its codecs. The image is written to a
+    temporary file and renamed, so an output that exists is always complete
+    (manifest resume).
+    """
+    part_path = output_path.with_name(f".{output_path.name}.part")
+    if output_path.suffix.lower() != ".webp" and is_rgb_png(image_bytes):
+        part_path.write_bytes(image_bytes)
+        os.replace(part_path, output_path)
+        return
+
+    from PIL import Image
+
+    image = Image.open(BytesIO(image_bytes))
+    if image.mode == 'RGBA':
+        rgb_image = Image.new('RGB', image.size, (255, 255, 255))
+        rgb_image.paste(image, mask=image.split()[3])
+        image = rgb_image
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    if output_path.suffix.lower() == ".webp":
+        image.save(str(part_path), 'WEBP', lossless=True, **WEBP_LOSSLESS_OPTIONS)
+    else:
+        image.save(str(part_path), 'PNG', compress_level=png_compression)
+    os.replace(part_path, output_path)
+
+
+def result_cache_key(
+    prompt: str,
+    input_images: list | None,
+    aspect_ratio: str | None,
+    resolution: str,
+    grounding: bool,
+    variant: int,
+) -> str:
+    """Hash every request parameter that determines a generated image."""
+    inputs = [img.key for img in input_images or []]
+    fields = [MODEL, prompt, inputs, aspect_ratio, resolution, grounding, variant]
+    return hashlib.sha256(json.dumps(fields).encode()).hexdigest()
+
+
+def load_result(key: str) -> tuple[bytes, str | None] | None:
+    """Return the cached (image bytes, model text) for key, or None.
+
+    A corrupt entry counts as a miss and is removed.
+    """
+    path = RESULT_CACHE_DIR / f"{key}.bin"
+    try:
+        raw = path.read_bytes()
+        header, _, image_bytes = raw.partition(b"\n")
+        text = json.loads(header)["text"]
+        if not image_bytes:
+            raise ValueError("no image data")
+        os.utime(path)  # Mark as recently used
+    except OSError:
+        return None
+    except (ValueError, KeyError, TypeError):
+        try:
+            path.unlink(missing_ok=True)
+        except OSError:
+            pass
         return None
-    return [img.copy() for img in images]
+    return image_bytes, text
+
+
+def store_result(key: str, image_bytes: bytes, text: str | None):
+    """Cache the image bytes as received from the model, with its text."""
+    path = RESULT_CACHE_DIR / f"{key}.bin"
+    try:
+        RESULT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        part_path = path.with_name(f".{path.name}.{os.getpid()}.part")
+        with part_path.open("wb") as f:
+            f.write(json.dumps({"text": text}).encode() + b"\n")
+            f.write(image_bytes)
+        os.replace(part_path, path)
+        evict_lru(RESULT_CACHE_DIR, RESULT_CACHE_MAX_BYTES)
+    except OSError:
+        pass  # The cache is an optimization only
+
+
+class TokenBucket:
+    """Token-bucket rate limiter: `rate` requests per minute, in bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.interval = 60 / rate if rate else 0
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self.interval)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) * self.interval)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits, server errors and dropped connections are worth retrying."""
+    import httpx
+    from google.genai import errors
+
+    if isinstance(error, errors.APIError):
+        return error.code in RETRYABLE_STATUS
+    return isinstance(error, httpx.TransportError)
+
+
+class RequestScheduler:
+    """Runs requests with bounded concurrency, a rate limit and jittered retries."""
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, rate: float = DEFAULT_RATE):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(rate, burst=concurrency)
+
+    async def run(self, make_request, timing: dict):
+        """Await make_request() once a slot and a token are free, retrying transient errors."""
+        async with self.semaphore:
+            for attempt in range(1, MAX_ATTEMPTS + 1):
+                await self.bucket.acquire()
+                try:
+                    return await make_request()
+                except Exception as e:
+                    if attempt == MAX_ATTEMPTS or not is_retryable(e):
+                        raise
+                    timing["retries"] += 1
+                    backoff = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1))
+                    await asyncio.sleep(random.uniform(0, backoff))
+
+
+class FakeBackend:
+    """Offline stand-in for genai.Client that returns synthetic images after a delay.
+
+    A backend is anything with the part of the client's async surface this
+    script uses: aio.models.generate_content, aio.files.upload / get, plus
+    aclose() to release it at the end of a run. Requests fail with a retryable 429 or 503 at `error_rate`.
+    Images are `size` px square PNGs, or sized from the requested resolution;
+    `payload` overrides them with fixed image bytes. Each response decodes
+    its image from base64 afresh, as the SDK does.
+    """
+
+    def __init__(self, latency: float = FAKE_LATENCY, error_rate: float = 0.0,
+                 size: int | None = None, payload: bytes | None = None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.size = size
+        self.encoded = {}  # Pixel size -> base64 PNG, as it arrives from the API
+        if payload is not None:
+            self.encoded[None] = base64.b64encode(payload)
+        self.uploads = 0
+        self.aio = SimpleNamespace(
+            models=SimpleNamespace(generate_content=self.generate_content),
+            files=SimpleNamespace(upload=self.upload, get=self.get),
+        )
+
+    def encode_image(self, dim: int) -> bytes:
+        """Base64 PNG of a photo-like dim x dim image (gradients plus soft grain)."""
+        from PIL import Image, ImageFilter
+
+        if dim not in self.encoded:
+            base = Image.radial_gradient("L").resize((dim, dim))
+            grain = Image.effect_noise((dim, dim), 24).filter(ImageFilter.GaussianBlur(2))
+            image = Image.merge("RGB", (base, Image.blend(base, grain, 0.3), grain))
+            out = BytesIO()
+            image.save(out, "PNG", compress_level=1)
+            self.encoded[dim] = base64.b64encode(out.getvalue())
+        return self.encoded[dim]
+
+    async def generate_content(self, model, contents, config=None):
+        from google.genai import errors, types
+
+        await asyncio.sleep(self.latency * random.uniform(0.8, 1.2))
+        if random.random() < self.error_rate:
+            code = random.choice(FAKE_ERROR_STATUS)
+            raise errors.APIError(code, {"error": {"code": code, "message": "Simulated failure", "status": "UNAVAILABLE"}})
+
+        if None in self.encoded:
+            encoded = self.encoded[None]
+        else:
+            image_config = config.image_config if config else None
+            dim = self.size or RESOLUTION_PIXELS.get(image_config and image_config.image_size, 1024)
+            encoded = self.encoded.get(dim) or await asyncio.to_thread(self.encode_image, dim)
+        parts = [types.Part(text="Simulated image"), types.Part.from_bytes(data=base64.b64decode(encoded), mime_type="image/png")]
+        return types.GenerateContentResponse(candidates=[types.Candidate(content=types.Content(role="model", parts=parts))])
+
+    async def upload(self, file, config=None):
+        from google.genai import types
+
+        # No expiration_time, so upload_references keeps the handle for this run only
+        self.uploads += 1
+        name = f"files/fake-{self.uploads}"
+        return types.File(name=name, uri=f"fake://{name}", mime_type=(config or {}).get("mime_type"), state="ACTIVE")
+
+    async def get(self, name):
+        from google.genai import types
+
+        return types.File(name=name, uri=f"fake://{name}", state="ACTIVE")
+
+    async def aclose(self):
+        pass
+
+
+def fake_options(spec: str) -> dict:
+    """FakeBackend arguments from "latency=S,errors=P,size=PX" (all optional)."""
+    names = {"latency": ("latency", float), "errors": ("error_rate", float), "size": ("size", int)}
+    options = {}
+    for item in filter(None, spec.split(",")):
+        key, _, value = item.partition("=")
+        if key not in names:
+            raise ValueError(f"unknown fake backend option {key!r} (expected latency, errors or size)")
+        name, convert = names[key]
+        options[name] = convert(value)
+    return options
 
 
 async def generate_image_async(
@@ -177,18 +702,25 @@ async def generate_image_async(
     aspect_ratio: str | None = None,
     resolution: str | None = None,
     grounding: bool = False,
+    timing: dict | None = None,
+    png_compression: int = DEFAULT_PNG_COMPRESSION,
+    cache_key: str | None = None,
 ) -> str | None:
     """
     Generate or edit an image asynchronously.
 
     Args:
-        client: The genai Client instance
+        client: The genai Client instance, or another backend (see FakeBackend)
         prompt: Text description or edit instruction
         output_path: Path to save the output image
-        input_images: Optional list of PIL Image objects for editing/composition
+        input_images: Optional list of ReferenceImage objects for editing/composition
         aspect_ratio: Aspect ratio (1:1, 16:9, etc.)
         resolution: Output resolution (1K, 2K, 4K)
         grounding: Enable Google Search grounding
+        timing: Optional dict; seconds spent on the request ("network") and on
+            decoding and saving the image ("decode") are added to it
+        png_compression: zlib level for PNG output
+        cache_key: If set, the result is stored in the result cache under it
 
     Returns:
         Any text response from the model, or None
@@ -201,7 +733,7 @@ async def generate_image_async(
 
     # Build contents: images first (if any), then prompt
     if input_images:
-        contents = input_images + [prompt]
+        contents = [img.part for img in input_images] + [prompt]
     else:
         contents = [prompt]
 
@@ -224,33 +756,36 @@ async def generate_image_async(
     config = types.GenerateContentConfig(**config_kwargs)
 
     # Use async API - properly handles concurrent requests
-    response = await client.aio.models.generate_content(
-        model=MODEL,
-        contents=contents,
-        config=config,
-    )
+    started = time.monotonic()
+    try:
+        response = await client.aio.models.generate_content(
+            model=MODEL,
+            contents=contents,
+            config=config,
+        )
+    finally:
+        if timing is not None:
+            timing["network"] += time.monotonic() - started
 
-    image, text_response = extract_image_and_text(response)
+    started = time.monotonic()
+    image_bytes, text_response = extract_image_and_text(response)
 
-    if not image:
+    if not image_bytes:
         raise RuntimeError("No image was generated. Check your prompt and try again.")
 
-    # Convert to RGB if needed and save as PNG
-    if image.mode == 'RGBA':
-        from PIL import Image as PILImage
-        rgb_image = PILImage.new('RGB', image.size, (255, 255, 255))
-        rgb_image.paste(image, mask=image.split()[3])
-        rgb_image.save(str(output_path), 'PNG')
-    elif image.mode == 'RGB':
-        image.save(str(output_path), 'PNG')
-    else:
-        image.convert('RGB').save(str(output_path), 'PNG')
+    # Decode and encode off the event loop, so other requests keep making progress
+    await asyncio.to_thread(save_image, image_bytes, output_path, png_compression)
+    if cache_key:
+        await asyncio.to_thread(store_result, cache_key, image_bytes, text_response)
 
+    if timing is not None:
+        timing["decode"] += time.monotonic() - started
     return text_response
 
 
 async def generate_single(
     client,
+    scheduler: RequestScheduler,
     idx: int,
     total: int,
     out_path: Path,
@@ -259,24 +794,62 @@ async def generate_single(
     aspect_ratio: str | None,
     resolution: str | None,
     grounding: bool,
-) -> tuple[int, Path, str | None, Exception | None]:
-    """Generate a single image, return (index, path, text, error)."""
-    try:
-        # Copy input images for this task to avoid concurrent access issues
-        task_images = copy_images(input_images)
+    png_compression: int = DEFAULT_PNG_COMPRESSION,
+    cache: str = "off",
+    variant: int | None = None,
+) -> tuple[int, Path, str | None, Exception | None, dict]:
+    """Generate a single image, return (index, path, text, error, timing).
+
+    timing holds seconds spent queueing (waiting for a slot, a rate-limit
+    token or a retry), on the network and decoding, plus the retry count
+    and whether the result came from the cache. cache is "off", "on" (use
+    and fill the result cache) or "refresh" (only fill it). variant is the
+    variant number in the cache key and defaults to idx.
+    """
+    timing = {"queue": 0.0, "network": 0.0, "decode": 0.0, "retries": 0, "cached": 0}
+    started = time.monotonic()
+
+    cache_key = None
+    if cache != "off":
+        if variant is None:
+            variant = idx
+        cache_key = result_cache_key(
+            prompt, input_images, aspect_ratio, resolution or detect_resolution(input_images or []), grounding, variant
+        )
+    if cache == "on":
+        cached = await asyncio.to_thread(load_result, cache_key)
+        if cached is not None:
+            image_bytes, text = cached
+            try:
+                await asyncio.to_thread(save_image, image_bytes, out_path, png_compression)
+                error = None
+            except Exception as e:
+                text, error = None, e
+            timing["decode"] = time.monotonic() - started
+            timing["cached"] = 1
+            return (idx, out_path, text, error, timing)
 
-        text = await generate_image_async(
+    async def attempt():
+        return await generate_image_async(
             client=client,
             prompt=prompt,
             output_path=out_path,
-            input_images=task_images,
+            input_images=input_images,
             aspect_ratio=aspect_ratio,
             resolution=resolution,
             grounding=grounding,
+            timing=timing,
+            png_compression=png_compression,
+            cache_key=cache_key,
         )
-        return (idx, out_path, text, None)
+
+    try:
+        text = await scheduler.run(attempt, timing)
+        error = None
     except Exception as e:
-        return (idx, out_path, None, e)
+        text, error = None, e
+    timing["queue"] = time.monotonic() - started - timing["network"] - timing["decode"]
+    return (idx, out_path, text, error, timing)
 
 
 async def run_batch(
@@ -287,13 +860,22 @@ async def run_batch(
     aspect_ratio: str | None,
     resolution: str | None,
     grounding: bool,
-) -> list[tuple[int, Path, str | None, Exception | None]]:
-    """Run batch generation using asyncio.gather for true async parallelism."""
+    scheduler: RequestScheduler | None = None,
+    png_compression: int = DEFAULT_PNG_COMPRESSION,
+    cache: str = "off",
+) -> AsyncIterator[tuple[int, Path, str | None, Exception | None, dict]]:
+    """Run batch generation through the scheduler, yielding each result as soon as it completes.
+
+    The scheduler bounds concurrency and request rate. Requests still in
+    flight are cancelled if the caller stops iterating.
+    """
+    scheduler = scheduler or RequestScheduler()
     total = len(output_paths)
 
     tasks = [
-        generate_single(
+        asyncio.ensure_future(generate_single(
             client=client,
+            scheduler=scheduler,
             idx=i,
             total=total,
             out_path=path,
@@ -302,56 +884,534 @@ async def run_batch(
             aspect_ratio=aspect_ratio,
             resolution=resolution,
             grounding=grounding,
-        )
+            png_compression=png_compression,
+            cache=cache,
+        ))
         for i, path in enumerate(output_paths, 1)
     ]
 
-    # Run all tasks concurrently with asyncio.gather
-    return await asyncio.gather(*tasks)
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def print_timing_summary(timings: list[dict], elapsed: float):
+    """Print mean / p95 / max of each timing phase across the batch."""
+    print(f"\nTiming ({len(timings)} requests, {elapsed:.1f}s wall):")
+    for phase in ("queue", "network", "decode"):
+        values = sorted(t[phase] for t in timings)
+        mean = sum(values) / len(values)
+        p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+        print(f"  {phase:<8} mean {mean:6.2f}s  p95 {p95:6.2f}s  max {values[-1]:6.2f}s")
+    retries = sum(t["retries"] for t in timings)
+    if retries:
+        print(f"  retries  {retries}")
+    cached = sum(t["cached"] for t in timings)
+    if cached:
+        print(f"  cached   {cached} (no API call)")
+
+
+class LazyClient:
+    """The genai client, created on first use.
+
+    Importing the SDK dominates startup, so runs served entirely from the
+    result cache never pay for it. In the warm worker the client is kept
+    open (keep_open) and shared by later calls.
+    """
+
+    def __init__(self, api_key: str, keep_open: bool = False):
+        self.api_key = api_key
+        self.keep_open = keep_open
+        self.client = None
+
+    @property
+    def aio(self):
+        if self.client is None:
+            from google import genai
+
+            self.client = genai.Client(api_key=self.api_key)
+        return self.client.aio
+
+    async def aclose(self):
+        if self.client is not None and not self.keep_open:
+            await self.client.aio.aclose()
+            self.client = None
+
 
+def create_client(backend: str = "gemini"):
+    """Create the backend shared by every request.
 
-async def async_main(args, input_images, input_paths, output_paths):
-    """Async entry point for image generation."""
-    from google import genai
+    "gemini" is the genai client (and its HTTP connection pool);
+    "fake[:latency=S,errors=P,size=PX]" is a FakeBackend, which needs no key.
+    """
+    name, _, options = backend.partition(":")
+    if name == "fake":
+        fake = FakeBackend(**fake_options(options))
+        print(f"Backend: fake ({fake.latency:g}s latency, {fake.error_rate:.0%} errors, no API calls)")
+        return fake
 
     api_key = get_api_key()
     if not api_key:
         print("Error: GEMINI_API_KEY environment variable not set", file=sys.stderr)
         sys.exit(1)
+    if worker_loop is None:
+        return LazyClient(api_key)
+    identity = (api_key, os.environ.get("GOOGLE_GEMINI_BASE_URL"))
+    if identity not in warm_clients:
+        warm_clients[identity] = LazyClient(api_key, keep_open=True)
+    return warm_clients[identity]
 
-    # Create a single client instance for all requests
-    client = genai.Client(api_key=api_key)
 
-    print("Generating...")
+async def run_job(
+    client,
+    scheduler: RequestScheduler,
+    job: dict,
+    total: int,
+    uploaded: dict | None = None,
+    png_compression: int = DEFAULT_PNG_COMPRESSION,
+    cache: str = "off",
+) -> dict:
+    """Run one manifest job and return its report record.
+
+    With `uploaded` (see upload_references), input images are sent as file
+    handles instead of inline.
+    """
+    output = job["output"]
+    record = {"job": job["job"], "output": str(output)}
+    if output.exists():
+        return {**record, "status": "skipped"}
 
-    # Run batch with async parallelism
-    batch_results = await run_batch(
+    try:
+        input_images = None
+        if job["inputs"]:
+            input_images = await asyncio.to_thread(load_input_images, job["inputs"], False)
+            if uploaded is not None:
+                input_images = await upload_references(client, input_images, uploaded)
+        output.parent.mkdir(parents=True, exist_ok=True)
+    except Exception as e:
+        return {**record, "status": "error", "error": str(e)}
+
+    aspect = job["aspect"]
+    if aspect is None:
+        aspect = get_closest_aspect_ratio(*input_images[-1].size) if input_images else "1:1"
+
+    _, _, text, error, timing = await generate_single(
         client=client,
-        output_paths=output_paths,
-        prompt=args.prompt,
+        scheduler=scheduler,
+        idx=job["job"],
+        total=total,
+        out_path=output,
+        prompt=job["prompt"],
         input_images=input_images,
-        aspect_ratio=args.aspect,
-        resolution=args.resolution,
-        grounding=args.grounding,
+        aspect_ratio=aspect,
+        resolution=job["resolution"],
+        grounding=job["grounding"],
+        png_compression=png_compression,
+        cache=cache,
+        variant=1,  # Each job is one image, like a single-image batch
     )
+    timing = {phase: round(value, 3) for phase, value in timing.items()}
+    if error:
+        return {**record, "status": "error", "error": str(error), "timing": timing}
+
+    sources = [str(p) for p in job["inputs"]]
+    save_prompt_log(output.with_suffix(".md"), job["prompt"], [output], sources or None)
+    return {**record, "status": "ok", "text": text, "timing": timing}
+
+
+async def run_manifest(args, client, jobs: list[dict], report_path: Path) -> dict:
+    """Run manifest jobs through a worker pool, appending each result to the report."""
+    scheduler = RequestScheduler(args.concurrency, args.rate)
+    counts = {"ok": 0, "error": 0, "skipped": 0}
+    timings = []
+    uploaded = {} if args.upload_inputs else None
+    pending = iter(jobs)
+
+    # Each worker holds one job (and its input images) at a time
+    async def worker(report):
+        for job in pending:
+            record = await run_job(
+                client, scheduler, job, len(jobs), uploaded, args.png_compression, cache_mode(args)
+            )
+            report.write(json.dumps(record) + "\n")
+            report.flush()
+            counts[record["status"]] += 1
+            if "timing" in record:
+                timings.append(record["timing"])
+            done = sum(counts.values())
+            if record["status"] == "error":
+                print(f"[{done}/{len(jobs)}] job {job['job']} error: {record['error']}", file=sys.stderr)
+            else:
+                print(f"[{done}/{len(jobs)}] job {job['job']} {record['status']}: {record['output']}")
+
+    print(f"Running {len(jobs)} jobs (up to {args.concurrency} in parallel)...")
+    started = time.monotonic()
+    try:
+        with report_path.open("a") as report:
+            await asyncio.gather(*(worker(report) for _ in range(min(args.concurrency, len(jobs)))))
+    finally:
+        await client.aclose()
+
+    if timings:
+        print_timing_summary(timings, time.monotonic() - started)
+    return counts
+
+
+async def async_main(args, client, input_images, input_paths, output_paths, log_path):
+    """Async entry point for image generation.
+
+    Each image is reported as soon as it is saved: a human-readable line, a
+    MEDIA line and a `PROGRESS: {json}` event, and the prompt log is
+    rewritten to list every image saved so far. If the run is interrupted,
+    everything reported is already on disk.
+    """
+    scheduler = RequestScheduler(args.concurrency, args.rate)
+
+    print("Generating...", flush=True)
+
+    # Run batch with async parallelism
+    saved = {}
+    timings = []
+    started = time.monotonic()
+    try:
+        if input_images and args.upload_inputs:
+            input_images = await upload_references(client, input_images, {})
+        async for idx, out_path, text, error, timing in run_batch(
+            client=client,
+            output_paths=output_paths,
+            prompt=args.prompt,
+            input_images=input_images,
+            aspect_ratio=args.aspect,
+            resolution=args.resolution,
+            grounding=args.grounding,
+            scheduler=scheduler,
+            png_compression=args.png_compression,
+            cache=cache_mode(args),
+        ):
+            timings.append(timing)
+            event = {
+                "event": "image",
+                "index": idx,
+                "total": args.batch,
+                "completed": len(timings),
+                "timing": {phase: round(value, 3) for phase, value in timing.items()},
+            }
+            if error:
+                print(f"\n[{idx}/{args.batch}] Error: {error}", file=sys.stderr)
+                event.update(status="error", error=str(error))
+            else:
+                full_path = out_path.resolve()
+                saved[idx] = full_path
+                save_prompt_log(log_path, args.prompt, [saved[i] for i in sorted(saved)], input_paths or None)
+                print(f"\n[{idx}/{args.batch}] Image saved: {full_path}")
+                print(f"MEDIA: {full_path}")
+                if text:
+                    print(f"Model response: {text}")
+                event.update(status="ok", path=str(full_path))
+            print(f"PROGRESS: {json.dumps(event)}", flush=True)
+    finally:
+        await client.aclose()
+
+    print_timing_summary(timings, time.monotonic() - started)
+    return [saved[i] for i in sorted(saved)]
+
+
+def run_async(coro):
+    """asyncio.run(coro), or in the warm worker, run it on the worker's long-lived loop."""
+    if worker_loop is None:
+        return asyncio.run(coro)
+    return asyncio.run_coroutine_threadsafe(coro, worker_loop).result()
+
+
+class WorkerStream(TextIOBase):
+    """stdout / stderr of a worker call: each write is relayed to the caller as a JSON line."""
+
+    def __init__(self, wfile, name: str, lock):
+        self.wfile = wfile
+        self.name = name
+        self.lock = lock
+
+    def write(self, text: str) -> int:
+        if text:
+            with self.lock:
+                try:
+                    self.wfile.write(json.dumps({self.name: text}).encode() + b"\n")
+                except OSError:
+                    pass  # The caller went away; the call still runs to completion
+        return len(text)
+
+
+def run_worker_call(request: dict, wfile) -> int:
+    """Run one CLI call in the worker with the caller's arguments, directory and environment."""
+    import threading
+    import traceback
+
+    saved_env = {name: os.environ.get(name) for name in WORKER_ENV}
+    saved_streams = sys.stdout, sys.stderr
+    lock = threading.Lock()
+    try:
+        for name in WORKER_ENV:
+            if name in request["env"]:
+                os.environ[name] = request["env"][name]
+            else:
+                os.environ.pop(name, None)
+        os.chdir(request["cwd"])
+        sys.stdout, sys.stderr = WorkerStream(wfile, "stdout", lock), WorkerStream(wfile, "stderr", lock)
+        try:
+            main(request["argv"])
+            return 0
+        except SystemExit as e:
+            if isinstance(e.code, int) or e.code is None:
+                return e.code or 0
+            print(e.code, file=sys.stderr)
+            return 1
+        except Exception:
+            traceback.print_exc()
+            return 1
+    finally:
+        sys.stdout, sys.stderr = saved_streams
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def serve_worker():
+    """Run the warm worker: a Unix-socket server that runs one CLI call at a time.
+
+    Each connection sends {"argv", "cwd", "env"} as one JSON line. While
+    another call is running (calls swap the process's cwd, environment and
+    streams) it gets back {"busy": true} and runs in-process instead;
+    otherwise {"accepted": true}, the call's output as {"stdout": text} /
+    {"stderr": text} lines, then {"exit": code}. Every call runs on one
+    long-lived event loop, so the SDK stays imported and its connections
+    stay open. The worker exits after WORKER_IDLE_TIMEOUT seconds without
+    calls, or once this script changes on disk so the next call starts a
+    fresh one.
+    """
+    import fcntl
+    import socketserver
+    import threading
+
+    global worker_loop
+    WORKER_SOCKET.parent.mkdir(parents=True, exist_ok=True)
+    lock_file = open(WORKER_SOCKET.with_suffix(".lock"), "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return  # Another worker is already serving
+    WORKER_SOCKET.unlink(missing_ok=True)
+
+    worker_loop = asyncio.new_event_loop()
+    threading.Thread(target=worker_loop.run_forever, daemon=True).start()
+    # Pay for the heavy imports now, not on the first call
+    from google import genai  # noqa: F401
+    from PIL import Image  # noqa: F401
+
+    last_call = [time.monotonic()]
+    busy = threading.Lock()
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            request = json.loads(self.rfile.readline())
+            if not busy.acquire(blocking=False):
+                self.wfile.write(json.dumps({"busy": True}).encode() + b"\n")
+                return
+            try:
+                self.wfile.write(json.dumps({"accepted": True}).encode() + b"\n")
+                code = run_worker_call(request, self.wfile)
+                self.wfile.write(json.dumps({"exit": code}).encode() + b"\n")
+            except OSError:
+                pass  # The caller went away
+            finally:
+                last_call[0] = time.monotonic()
+                busy.release()
+
+    class Server(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+    def watchdog(server):
+        script_mtime = os.path.getmtime(__file__)
+        while True:
+            time.sleep(WORKER_WATCH_INTERVAL)
+            try:
+                changed = os.path.getmtime(__file__) != script_mtime
+            except OSError:
+                changed = True
+            if busy.locked():
+                continue  # Never cut a call short
+            if changed or time.monotonic() - last_call[0] > WORKER_IDLE_TIMEOUT:
+                server.shutdown()
+                return
+
+    os.umask(0o077)
+    with Server(str(WORKER_SOCKET), Handler) as server:
+        threading.Thread(target=watchdog, args=(server,), daemon=True).start()
+        try:
+            server.serve_forever()
+        finally:
+            WORKER_SOCKET.unlink(missing_ok=True)
+
+
+def call_worker(argv: list[str]) -> int | None:
+    """Run this CLI call in the warm worker, relaying its output; return its exit code.
+
+    Returns None, so the call runs in-process, if the worker is busy with
+    another call or doesn't accept this one within WORKER_CONNECT_TIMEOUT.
+    If no worker is listening, one is also started in the background for
+    the next call.
+    """
+    import socket
+    import subprocess
+
+    request = {
+        "argv": argv,
+        "cwd": os.getcwd(),
+        "env": {name: os.environ[name] for name in WORKER_ENV if name in os.environ},
+    }
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(WORKER_CONNECT_TIMEOUT)
+        try:
+            sock.connect(str(WORKER_SOCKET))
+        except OSError:
+            subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), "--serve-worker"],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True,
+            )
+            return None
+        replies = sock.makefile("rb")
+        try:
+            sock.sendall(json.dumps(request).encode() + b"\n")
+            reply = json.loads(replies.readline())
+        except (OSError, ValueError):
+            return None  # Hung or dying worker: nothing has run yet
+        if not reply.get("accepted"):
+            return None  # Busy with another call
+        sock.settimeout(None)  # Accepted: the call takes as long as its requests do
+        for line in replies:
+            message = json.loads(line)
+            if "exit" in message:
+                return message["exit"]
+            for name, text in message.items():
+                stream = sys.stdout if name == "stdout" else sys.stderr
+                stream.write(text)
+                stream.flush()
+    print("Error: the warm worker exited during the call", file=sys.stderr)
+    return 1
+
+
+def profile_startup(argv: list[str]) -> int:
+    """Re-run this call under `python -X importtime` and summarize where the time went.
+
+    Imports deferred into the run (the SDK on the first request) are
+    included. Returns the call's exit code.
+    """
+    import subprocess
+
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", os.path.abspath(__file__), *argv],
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    wall = time.perf_counter() - started
+
+    imports = []  # (cumulative us, module) of top-level imports
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            print(line, file=sys.stderr)
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit() and not name[1:].startswith(" "):
+            imports.append((int(cumulative), name.strip()))
+
+    total = sum(us for us, _ in imports) / 1e6
+    print(f"\nStartup profile: {wall:.2f}s wall, {total:.2f}s importing ({len(imports)} top-level imports)")
+    for us, name in sorted(imports, reverse=True)[:15]:
+        print(f"  {us / 1000:8.1f}ms  {name}")
+    return proc.returncode
+
+
+def cache_mode(args) -> str:
+    """Result cache mode for generate_single from --cache/--no-cache and --refresh.
+
+    The fake backend never uses the result cache, so its images can't be
+    served for real requests.
+    """
+    if args.backend != "gemini":
+        return "off"
+    if args.refresh:
+        return "refresh"
+    return "on" if args.cache else "off"
+
+
+def positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1."""
+    import argparse
+
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def non_negative_float(value: str) -> float:
+    """argparse type for rates that must be 0 or more."""
+    import argparse
+
+    number = float(value)
+    if not number >= 0:  # Also rejects nan
+        raise argparse.ArgumentTypeError(f"must be 0 or more, got {value}")
+    return number
 
-    # Process results
-    results = []
-    for idx, out_path, text, error in sorted(batch_results, key=lambda x: x[0]):
-        if error:
-            print(f"\n[{idx}/{args.batch}] Error: {error}", file=sys.stderr)
-        else:
-            full_path = out_path.resolve()
-            print(f"\n[{idx}/{args.batch}] Image saved: {full_path}")
-            print(f"MEDIA: {full_path}")
-            if text:
-                print(f"Model response: {text}")
-            results.append(full_path)
 
-    return results
+def backend_spec(value: str) -> str:
+    """argparse type for --backend: "gemini" or "fake[:options]"."""
+    import argparse
 
+    name, _, options = value.partition(":")
+    if name == "gemini" and not options:
+        return value
+    if name == "fake":
+        try:
+            fake_options(options)
+            return value
+        except ValueError as e:
+            raise argparse.ArgumentTypeError(str(e))
+    raise argparse.ArgumentTypeError(f"expected gemini or fake[:latency=S,errors=P,size=PX], got {value!r}")
 
-def main():
+
+def manifest_main(args):
+    """Run every job of args.manifest, then exit non-zero if any failed."""
+    try:
+        jobs = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"Error reading manifest {args.manifest}: {e}", file=sys.stderr)
+        sys.exit(1)
+    if not jobs:
+        print(f"Error: No jobs in {args.manifest}", file=sys.stderr)
+        sys.exit(1)
+
+    report_path = args.report or args.manifest.with_suffix(".report.jsonl")
+    client = create_client(args.backend)
+    counts = run_async(run_manifest(args, client, jobs, report_path))
+    print(f"\nReport: {report_path.resolve()}")
+    print(f"Jobs: {counts['ok']} generated, {counts['skipped']} skipped (already done), {counts['error']} failed")
+    if counts["error"]:
+        sys.exit(1)
+
+
+def main(argv: list[str] | None = None):
+    import argparse
+
+    argv = sys.argv[1:] if argv is None else argv
     parser = argparse.ArgumentParser(
         description="Generate and edit images using Gemini Pro Image API",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -359,13 +1419,11 @@ def main():
     )
     parser.add_argument(
         "--prompt", "-p",
-        required=True,
-        help="Image description or edit instruction"
+        help="Image description or edit instruction (required without --manifest)"
     )
     parser.add_argument(
         "--output", "-o",
-        required=True,
-        help="Output file path (e.g., output.png)"
+        help="Output file path, e.g. output.png or output.webp for lossless WebP (required without --manifest)"
     )
     parser.add_argument(
         "--input", "-i",
@@ -375,12 +1433,12 @@ def main():
     )
     parser.add_argument(
         "--aspect", "-a",
-        choices=["1:1", "2:3", "3:2", "3:4", "4:3", "4:5", "5:4", "9:16", "16:9", "21:9"],
+        choices=ASPECT_RATIOS,
         help="Aspect ratio"
     )
     parser.add_argument(
         "--resolution", "-r",
-        choices=["1K", "2K", "4K"],
+        choices=RESOLUTIONS,
         help="Output resolution (default: auto-detect from input or 1K)"
     )
     parser.add_argument(
@@ -390,17 +1448,104 @@ def main():
     )
     parser.add_argument(
         "--batch", "-b",
-        type=int,
-        choices=[1, 2, 3, 4],
+        type=positive_int,
         default=1,
-        help="Generate multiple variations (1-4, default: 1)"
+        help="Generate multiple variations (default: 1)"
+    )
+    parser.add_argument(
+        "--concurrency", "-c",
+        type=positive_int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Requests in flight at once (default: {DEFAULT_CONCURRENCY})"
+    )
+    parser.add_argument(
+        "--rate",
+        type=non_negative_float,
+        default=DEFAULT_RATE,
+        help=f"Requests started per minute, 0 for no limit (default: {DEFAULT_RATE})"
+    )
+    parser.add_argument(
+        "--manifest", "-m",
+        type=Path,
+        help="JSONL or CSV file of jobs to generate in one run"
+    )
+    parser.add_argument(
+        "--report",
+        type=Path,
+        help="JSONL report of manifest jobs (default: <manifest>.report.jsonl)"
+    )
+    parser.add_argument(
+        "--upload-inputs",
+        action="store_true",
+        help="Upload input images once via the Files API instead of sending them inline with every request"
+    )
+    parser.add_argument(
+        "--png-compression",
+        type=int,
+        choices=range(10),
+        default=DEFAULT_PNG_COMPRESSION,
+        metavar="0-9",
+        help=f"PNG zlib compression level; lower is faster, files larger (default: {DEFAULT_PNG_COMPRESSION})"
+    )
+    parser.add_argument(
+        "--cache",
+        action=argparse.BooleanOptionalAction,
+        default=os.environ.get("GENERATE_IMAGE_CACHE") == "1",
+        help="Reuse results of identical earlier requests (default: off, or on with GENERATE_IMAGE_CACHE=1)"
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Regenerate and replace cached results (implies --cache)"
+    )
+    parser.add_argument(
+        "--backend",
+        type=backend_spec,
+        default=os.environ.get("GENERATE_IMAGE_BACKEND", "gemini"),
+        help="gemini, or fake[:latency=S,errors=P,size=PX] for synthetic images "
+             "without a key or quota (default: gemini, or GENERATE_IMAGE_BACKEND)"
+    )
+
+    parser.add_argument(
+        "--worker",
+        action=argparse.BooleanOptionalAction,
+        default=os.environ.get("GENERATE_IMAGE_WORKER") == "1",
+        help="Run in the warm worker, starting it if needed (default: off, or on with GENERATE_IMAGE_WORKER=1)"
+    )
+    parser.add_argument(
+        "--serve-worker",
+        action="store_true",
+        help="Run the warm worker in the foreground (normally started by --worker)"
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Run under python -X importtime and summarize the slowest imports"
     )
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+
+    if args.profile_startup:
+        sys.exit(profile_startup([arg for arg in argv if arg != "--profile-startup"]))
+    if args.serve_worker:
+        serve_worker()
+        return
+    if args.worker and worker_loop is None:
+        code = call_worker(argv)
+        if code is not None:
+            sys.exit(code)
+
+    if args.manifest:
+        if args.prompt or args.inputs:
+            parser.error("--manifest takes prompts and inputs from the manifest")
+        manifest_main(args)
+        return
+    if not args.prompt or not args.output:
+        parser.error("--prompt and --output are required (or use --manifest)")
 
     # Validate input count
-    if args.inputs and len(args.inputs) > 14:
-        print("Error: Maximum 14 input images allowed", file=sys.stderr)
+    if args.inputs and len(args.inputs) > MAX_INPUTS:
+        print(f"Error: Maximum {MAX_INPUTS} input images allowed", file=sys.stderr)
         sys.exit(1)
 
     # Set up output path
@@ -410,26 +1555,13 @@ def main():
 
     # Load input images if provided
     input_images = None
-    input_paths = []
-    if args.inputs:
-        from PIL import Image
-        input_images = []
-        for img_path in args.inputs:
-            try:
-                img = Image.open(img_path)
-                # Load image data into memory to avoid file handle issues
-                img.load()
-                original_size = img.size
-                img = optimize_image(img)
-                input_images.append(img)
-                input_paths.append(img_path)
-                if img.size != original_size:
-                    print(f"Loaded: {img_path} ({original_size[0]}x{original_size[1]} → {img.size[0]}x{img.size[1]})")
-                else:
-                    print(f"Loaded: {img_path} ({img.size[0]}x{img.size[1]})")
-            except Exception as e:
-                print(f"Error loading {img_path}: {e}", file=sys.stderr)
-                sys.exit(1)
+    input_paths = args.inputs or []
+    if input_paths:
+        try:
+            input_images = load_input_images(input_paths)
+        except Exception as e:
+            print(f"Error loading input images: {e}", file=sys.stderr)
+            sys.exit(1)
 
     # Auto-detect aspect ratio from last reference image if not specified
     if args.aspect:
@@ -456,7 +1588,7 @@ def main():
     if args.grounding:
         print("Google Search grounding: enabled")
     if args.batch > 1:
-        print(f"Batch: {args.batch} images (async parallel)")
+        print(f"Batch: {args.batch} images (up to {args.concurrency} in parallel)")
 
     # Generate output paths for batch
     if args.batch == 1:
@@ -467,16 +1599,15 @@ def main():
         parent = output_path.parent
         output_paths = [parent / f"{stem}-{i}{suffix}" for i in range(1, args.batch + 1)]
 
-    # Run async main
-    results = asyncio.run(async_main(args, input_images, input_paths, output_paths))
+    # Run async main; one prompt log lists all generated images
+    log_path = output_path.with_suffix(".md")
+    client = create_client(args.backend)
+    results = run_async(async_main(args, client, input_images, input_paths, output_paths, log_path))
 
     if not results:
         print("Error: No images were generated", file=sys.stderr)
         sys.exit(1)
 
-    # Save single prompt log for all generated images
-    log_path = output_path.with_suffix(".md")
-    save_prompt_log(log_path, args.prompt, results, input_paths if input_paths else None)
     print(f"\nPrompt log: {log_path.resolve()}")
 
     print(f"Generated {len(results)}/{args.batch} images")
@@ -4,18 +4,39 @@ Skill Validator - Validates skill structure and frontmatter for Claude Code
 
 Usage:
     validate_skill.py <skill_directory>
+    validate_skill.py --all <root> [--jobs N] [--no-cache]
 
 Example:
     validate_skill.py ~/.claude/skills/my-skill
+    validate_skill.py --all ~/.claude/skills
+
+--all validates every SKILL.md under <root> in parallel and prints a JSON
+summary with per-skill timings. Results are cached by file mtime, size and
+content hash (and this script's own hash), so unchanged skills are skipped.
 """
 
+import hashlib
+import json
+import os
 import re
 import sys
+import time
 from pathlib import Path
 
 import yaml
 
+try:
+    from yaml import CSafeLoader as SafeLoader  # LibYAML bindings, when PyYAML was built with them
+except ImportError:
+    from yaml import SafeLoader
+
 MAX_SKILL_NAME_LENGTH = 64
+READ_CHUNK_SIZE = 64 * 1024  # Bytes per read when scanning the body or hashing
+TODO_MARKER = "[TODO"
+
+CACHE_PATH = Path.home() / ".cache" / "validate-skill" / "results.json"
+SKIP_DIRS = {"node_modules", "__pycache__"}  # Never searched for skills, along with hidden directories
+PARALLEL_MIN_SKILLS = 16  # Below this many skills to validate, a process pool costs more than it saves
 
 # Claude Code supported frontmatter fields
 ALLOWED_FRONTMATTER = {
@@ -42,18 +63,39 @@ def validate_skill(skill_path):
     if not skill_md.exists():
         return False, "SKILL.md not found"
 
-    content = skill_md.read_text()
-    if not content.startswith("---"):
+    with open(skill_md) as stream:
+        return validate_stream(stream)
+
+
+def validate_stream(stream):
+    """Validate a SKILL.md from a text stream.
+
+    Only the frontmatter is read before it is checked: reading stops at the
+    closing ---. The body is then scanned in chunks, so a large skill is
+    never held in memory whole.
+    """
+    opening = stream.readline()
+    if not opening.startswith("---"):
         return False, "No YAML frontmatter found (must start with ---)"
+    if opening != "---\n":
+        return False, "Invalid frontmatter format (missing closing ---)"
 
-    match = re.match(r"^---\n(.*?)\n---", content, re.DOTALL)
-    if not match:
+    # The closing --- starts a line after the first frontmatter line
+    lines = [stream.readline()]
+    closing = None
+    while lines[-1]:
+        line = stream.readline()
+        if line.startswith("---"):
+            closing = line
+            break
+        lines.append(line)
+    if closing is None:
         return False, "Invalid frontmatter format (missing closing ---)"
 
-    frontmatter_text = match.group(1)
+    frontmatter_text = "".join(lines)[:-1]
 
     try:
-        frontmatter = yaml.safe_load(frontmatter_text)
+        frontmatter = yaml.load(frontmatter_text, Loader=SafeLoader)
         if not isinstance(frontmatter, dict):
             return False, "Frontmatter must be a YAML dictionary"
     except yaml.YAMLError as e:
@@ -104,23 +146,175 @@ def validate_skill(skill_path):
     if context and context != "fork":
         return False, f"Invalid context '{context}'. Only 'fork' is supported"
 
-    # Check body has content
-    body = content[match.end():].strip()
-    if not body:
+    # Check body has content; the body starts right after the closing ---
+    has_content = False
+    carry = ""  # End of the previous chunk, for a marker split across chunks
+    chunk = closing[3:]
+    while chunk:
+        if TODO_MARKER in carry + chunk:
+            return False, "SKILL.md contains TODO placeholders - please complete them"
+        has_content = has_content or not chunk.isspace()
+        carry = chunk[-(len(TODO_MARKER) - 1):]
+        chunk = stream.read(READ_CHUNK_SIZE)
+    if not has_content:
         return False, "SKILL.md body is empty"
-    if "[TODO" in body:
-        return False, "SKILL.md contains TODO placeholders - please complete them"
 
     return True, "Skill is valid"
 
 
+def find_skill_files(root):
+    """Yield every SKILL.md under root, skipping hidden and dependency directories."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith(".") and d not in SKIP_DIRS)
+        if "SKILL.md" in filenames:
+            yield os.path.join(dirpath, "SKILL.md")
+
+
+def validate_cached(skill_md, previous=None):
+    """Validate one SKILL.md, reusing `previous` (its cache entry) if the content is unchanged.
+
+    Returns the new cache entry, with the validation time and whether the
+    result came from the cache. A skill that can't be read or decoded is
+    reported invalid, with "error" set so the entry is never cached.
+    """
+    started = time.perf_counter()
+    try:
+        stat = os.stat(skill_md)
+        hasher = hashlib.sha256()
+        with open(skill_md, "rb") as f:
+            while chunk := f.read(READ_CHUNK_SIZE):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+        if previous and previous["sha256"] == digest:
+            valid, message, cached = previous["valid"], previous["message"], True
+        else:
+            valid, message = validate_skill(os.path.dirname(skill_md))
+            cached = False
+    except (OSError, UnicodeDecodeError, yaml.YAMLError) as e:
+        return {
+            "valid": False,
+            "message": f"Could not validate SKILL.md: {e}",
+            "cached": False,
+            "error": True,
+            "seconds": round(time.perf_counter() - started, 6),
+        }
+    return {
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha256": digest,
+        "valid": valid,
+        "message": message,
+        "cached": cached,
+        "seconds": round(time.perf_counter() - started, 6),
+    }
+
+
+def load_cache(validator):
+    """Cached entries by SKILL.md path, or {} if the cache is missing or from another validator."""
+    try:
+        cache = json.loads(CACHE_PATH.read_text())
+    except (OSError, ValueError):
+        return {}
+    return cache.get("entries", {}) if cache.get("validator") == validator else {}
+
+
+def save_cache(validator, entries):
+    try:
+        CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        part_path = CACHE_PATH.with_name(f".{CACHE_PATH.name}.{os.getpid()}.part")
+        part_path.write_text(json.dumps({"validator": validator, "entries": entries}))
+        os.replace(part_path, CACHE_PATH)
+    except OSError:
+        pass  # The cache is an optimization only
+
+
+def validate_all(root, jobs=None, use_cache=True):
+    """Validate every skill under root; return the JSON summary as a dict.
+
+    Skills whose SKILL.md mtime and size match the cache are not read at
+    all; the rest are hashed and, if the content changed, validated across
+    a process pool.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    started = time.perf_counter()
+    root = Path(root).expanduser().resolve()
+    # Validation rules live in this file, so its hash versions the cache
+    validator = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+    cache = load_cache(validator) if use_cache else {}
+
+    entries = {}
+    stale = []
+    for skill_md in find_skill_files(root):
+        previous = cache.get(skill_md)
+        try:
+            stat = os.stat(skill_md)
+        except OSError:
+            continue
+        if previous and (previous["mtime_ns"], previous["size"]) == (stat.st_mtime_ns, stat.st_size):
+            entries[skill_md] = {**previous, "cached": True, "seconds": 0.0}
+        else:
+            stale.append((skill_md, previous))
+
+    if stale:
+        workers = jobs or os.cpu_count() or 1
+        paths, previous = zip(*stale)
+        if workers > 1 and len(stale) >= PARALLEL_MIN_SKILLS:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = pool.map(validate_cached, paths, previous, chunksize=max(1, len(stale) // (workers * 4)))
+                entries.update(zip(paths, results))
+        else:
+            entries.update(zip(paths, map(validate_cached, paths, previous)))
+
+    if use_cache:
+        save_cache(validator, {path: entry for path, entry in entries.items() if not entry.get("error")})
+
+    skills = [
+        {
+            "skill": os.path.relpath(os.path.dirname(skill_md), root),
+            "valid": entry["valid"],
+            "message": entry["message"],
+            "cached": entry["cached"],
+            "seconds": entry["seconds"],
+        }
+        for skill_md, entry in sorted(entries.items())
+    ]
+    invalid = sum(not skill["valid"] for skill in skills)
+    return {
+        "root": str(root),
+        "total": len(skills),
+        "valid": len(skills) - invalid,
+        "invalid": invalid,
+        "cached": sum(skill["cached"] for skill in skills),
+        "seconds": round(time.perf_counter() - started, 6),
+        "skills": skills,
+    }
+
+
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: validate_skill.py <skill_directory>")
-        print("Example: validate_skill.py ~/.claude/skills/my-skill")
-        sys.exit(1)
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Validate skill structure and frontmatter",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument("skill_directory", nargs="?", help="Skill directory to validate")
+    parser.add_argument("--all", metavar="ROOT", help="Validate every SKILL.md under ROOT and print a JSON summary")
+    parser.add_argument("--jobs", "-j", type=int, help="Worker processes for --all (default: CPU count)")
+    parser.add_argument("--no-cache", action="store_true", help="Revalidate every skill with --all")
+    args = parser.parse_args()
+
+    if args.all:
+        if args.skill_directory:
+            parser.error("--all takes a root directory instead of a skill directory")
+        summary = validate_all(args.all, args.jobs, not args.no_cache)
+        print(json.dumps(summary, indent=2))
+        sys.exit(1 if summary["invalid"] else 0)
+    if not args.skill_directory:
+        parser.error("a skill directory (or --all <root>) is required")
 
-    skill_path = sys.argv[1]
+    skill_path = args.skill_directory
     print(f"Validating: {skill_path}")
 
     valid, message = validate_skill(skill_path)